@@ -1,17 +1,35 @@
 import os
 import subprocess
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, NotFoundError
 import sys
 import datetime
 import logging
-from pdfminer.high_level import extract_text
 import json
-import markdown
-import pdfkit
-import PyPDF2
-import io
-import io
 import re
+import time
+import atexit
+import hashlib
+import tempfile
+import threading
+from types import SimpleNamespace
+from run_waiter import RunWaiter
+
+# Automatic message to double-check the cover letter after the initial draft
+DOUBLE_CHECK_MESSAGE = """
+        Please review the initial cover letter draft. Analyze and critique it based on the following criteria:
+        - Is the cover letter appropriate for the job?
+        - Are there any improvements that can be made in terms of language, structure, or content?
+        - Are all facts accurate?
+        - Is the formatting for markdown correctly done?
+        - Is the formatting ATS-friendly and visually appealing?
+        - Could any more appropriate skills or achievements be added?
+        - Is all the information factual, Additionally have you matched the right project to the right qualification?
+        - Have you used the right keywords and phrases? 
+        - Does it sound human and not robotic? Natural and proffesional
+
+        After analyzing, implement the improvements required and finalize the document.
+    """
+
 def run_cmd(command):
     try:
         result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
@@ -22,30 +40,226 @@ def run_cmd(command):
 def get_timestamp():
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+class AssistantRegistry:
+    # Keeps the IDs of assistants created for a given model + instructions + tools
+    # combination in a local JSON file, so warm starts need no network round trip.
+    # Agents in different threads share one registry per file (see shared()), and its
+    # lock makes concurrent cold misses create each assistant only once.
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, client, path="assistants.json", logger=None):
+        self.client = client
+        self.path = path
+        self.logger = logger or logging.getLogger('Agent')
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.entries = self._load()
+
+    @classmethod
+    def shared(cls, client, path="assistants.json", logger=None):
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                registry = cls(client, path, logger)
+                # last_used only changes on hits, which are not worth a write each; it is saved once at exit
+                atexit.register(registry.flush)
+                cls._shared[key] = registry
+            return cls._shared[key]
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        # A unique temporary file per write, so no two writers ever replace each other's half-written file
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix=".assistants-", suffix=".tmp", delete=False) as f:
+            json.dump(self.entries, f, indent=2)
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+        self._dirty = False
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    @staticmethod
+    def config_key(model, instructions, tools):
+        payload = json.dumps({"model": model, "instructions": instructions, "tools": tools}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_or_create(self, name, model, instructions, tools):
+        key = self.config_key(model, instructions, tools)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry:
+                entry["last_used"] = get_timestamp()
+                self._dirty = True
+                return SimpleNamespace(id=entry["id"], name=entry["name"])
+
+            assistant = self.client.beta.assistants.create(
+                name=name,
+                instructions=instructions,
+                model=model,
+                tools=tools
+            )
+            self.logger.info(f"Created assistant '{name}' ({assistant.id})")
+
+            # Older assistants with the same name were built from a previous configuration
+            stale_keys = [k for k, v in self.entries.items() if v["name"] == name]
+            self.entries[key] = {
+                "id": assistant.id,
+                "name": name,
+                "model": model,
+                "created": get_timestamp(),
+                "last_used": get_timestamp()
+            }
+            self.collect_garbage(stale_keys)
+            return assistant
+
+    def collect_garbage(self, keys=None, keep_keys=None):
+        # Deletes the given entries (or every entry not in keep_keys) remotely and locally
+        with self._lock:
+            if keys is None:
+                keep_keys = set(keep_keys or [])
+                keys = [k for k in self.entries if k not in keep_keys]
+            for key in keys:
+                entry = self.entries.pop(key, None)
+                if not entry:
+                    continue
+                try:
+                    self.client.beta.assistants.delete(entry["id"])
+                    self.logger.info(f"Deleted stale assistant '{entry['name']}' ({entry['id']})")
+                except Exception as e:
+                    self.logger.info(f"Error deleting assistant {entry['id']}: {str(e)}")
+            self._save()
+
+    def invalidate(self, assistant_id):
+        with self._lock:
+            self.entries = {k: v for k, v in self.entries.items() if v["id"] != assistant_id}
+            self._save()
+
+class ChatCompletionsBackend:
+    # Stateless alternative to the Assistants thread flow: the draft and the
+    # self-critique come back from one or two chat completions calls.
+    def __init__(self, client, model, system_prompt, logger=None, single_call=False):
+        self.client = client
+        self.model = model
+        self.system_prompt = system_prompt
+        self.logger = logger or logging.getLogger('Agent')
+        self.single_call = single_call
+        self.history = []
+
+    def generate(self, user_input):
+        started = time.monotonic()
+        stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        messages = self._messages(user_input)
+        if not self.single_call:
+            self._add_review(messages, self._complete(messages, stats))
+        return self._finish(self._complete(messages, stats, json_output=True), stats, started)
+
+    def _messages(self, user_input):
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_input}
+        ]
+        if self.single_call:
+            messages[-1]["content"] += (
+                "\n\nFirst write a draft, then review it as follows:\n" + DOUBLE_CHECK_MESSAGE +
+                "\nRespond with a JSON object with the keys \"draft\", \"critique\" and \"cover_letter\", "
+                "where \"cover_letter\" is the final cover letter in markdown."
+            )
+        return messages
+
+    def _add_review(self, messages, draft):
+        messages.append({"role": "assistant", "content": draft})
+        messages.append({"role": "user", "content": DOUBLE_CHECK_MESSAGE + (
+            "\nRespond with a JSON object with the keys \"critique\" and \"cover_letter\", "
+            "where \"cover_letter\" is the final cover letter in markdown."
+        )})
+
+    def _finish(self, content, stats, started):
+        result = json.loads(content)
+        self.logger.info(f"Critique: {result.get('critique', '')}")
+
+        stats["wall_time"] = time.monotonic() - started
+        self.history.append(stats)
+        self.logger.info(
+            f"Chat completions letter took {stats['wall_time']:.2f}s "
+            f"({stats['requests']} requests, {stats['prompt_tokens']} prompt / {stats['completion_tokens']} completion tokens)"
+        )
+        return result.get("cover_letter") or result.get("draft", "")
+
+    def _record_usage(self, response, stats):
+        stats["requests"] += 1
+        if response.usage:
+            stats["prompt_tokens"] += response.usage.prompt_tokens
+            stats["completion_tokens"] += response.usage.completion_tokens
+        return response.choices[0].message.content
+
+    def _complete(self, messages, stats, json_output=False):
+        kwargs = {"response_format": {"type": "json_object"}} if json_output else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **kwargs
+        )
+        return self._record_usage(response, stats)
+
+class AsyncChatCompletionsBackend(ChatCompletionsBackend):
+    # The same flow on an AsyncOpenAI client, so letters can be generated on the event loop
+    async def generate(self, user_input):
+        started = time.monotonic()
+        stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        messages = self._messages(user_input)
+        if not self.single_call:
+            self._add_review(messages, await self._complete(messages, stats))
+        return self._finish(await self._complete(messages, stats, json_output=True), stats, started)
+
+    async def _complete(self, messages, stats, json_output=False):
+        kwargs = {"response_format": {"type": "json_object"}} if json_output else {}
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **kwargs
+        )
+        return self._record_usage(response, stats)
+
 class Agent:
-  def __init__(self, api_key=None, model="gpt-4o-mini", additional_tools=None):
+  def __init__(self, api_key=None, model="gpt-4o-mini", additional_tools=None, run_deadline=300, registry_path="assistants.json", backend="assistants", client=None, thread_scope="job", max_prompt_tokens=16000):
       self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
       if not self.api_key:
           raise ValueError("API key must be provided or set as OPENAI_API_KEY environment variable")
       self.model = model
       self.additional_tools = additional_tools or []
-      self.client = OpenAI(api_key=self.api_key)
+      self.backend = backend
+      self.client = client or OpenAI(api_key=self.api_key)
 
       # Set up logging with UTF-8 encoding
       self.logger = logging.getLogger('Agent')
       self.logger.setLevel(logging.INFO)
-      file_handler = logging.FileHandler('agent.log', encoding='utf-8')
-      file_handler.setLevel(logging.INFO)
-      
-      formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-      file_handler.setFormatter(formatter)
-      self.logger.addHandler(file_handler)
-
-      # Add a stream handler for console output
-      console_handler = logging.StreamHandler(sys.stdout)
-      console_handler.setLevel(logging.INFO)
-      console_handler.setFormatter(formatter)
-      self.logger.addHandler(console_handler)
+      # Several Agents can share the logger (one per cover letter worker), only attach handlers once
+      if not self.logger.handlers:
+          file_handler = logging.FileHandler('agent.log', encoding='utf-8')
+          file_handler.setLevel(logging.INFO)
+
+          formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+          file_handler.setFormatter(formatter)
+          self.logger.addHandler(file_handler)
+
+          # Add a stream handler for console output
+          console_handler = logging.StreamHandler(sys.stdout)
+          console_handler.setLevel(logging.INFO)
+          console_handler.setFormatter(formatter)
+          self.logger.addHandler(console_handler)
       self.system_prompt = f"""
         You are an expert AI agent specializing in crafting outstanding, ATS-optimized cover letters. Your goal is to create compelling, tailored cover letters that showcase the applicant's qualifications and increase their chances of securing an interview. Follow these comprehensive guidelines:
 
@@ -110,25 +324,41 @@ class Agent:
         Remember, your ultimate goal is to create a cover letter that not only passes ATS screening but also compels human readers to invite the applicant for an interview. Tailor each letter to showcase the applicant as the ideal candidate for the specific position and company.
         """
 
-      self.assistant_no_tools = self.client.beta.assistants.create(
+      self.system_prompt_2 = self.system_prompt + " 9. Use tools to formalize and submit the document in pdf, Make SURE THAT ONCE THE TASK IS FINISHED YOU USE THE FINISH TASK TOOL "
+      self.tools = [
+          {"type": "function", "function": {"name": "file_operations", "description": "Performs file operations like read, write, list, or delete", "parameters": {"type": "object", "properties": {"operation": {"type": "string", "enum": ["read", "write", "list", "delete"], "description": "The operation to perform"}, "path": {"type": "string", "description": "The file or directory path"}, "content": {"type": "string", "description": "Content to write (for write operation)"}}, "required": ["operation", "path"]}}},
+          {"type": "function", "function": {"name": "markdown_to_pdf", "description": "Converts markdown content to PDF and saves it as cover.pdf in the current directory", "parameters": {"type": "object", "properties": {"markdown_content": {"type": "string", "description": "The markdown content to convert"}}, "required": ["markdown_content"]}}},
+          {"type": "function", "function": {"name": "finish_task", "description": "Signals that the current task is finished", "parameters": {"type": "object", "properties": {"message": {"type": "string", "description": "A message summarizing task completion"}}, "required": ["message"]}}},
+      ]
+      self.registry = AssistantRegistry.shared(self.client, registry_path, self.logger)
+      if self.backend == "assistants":
+          self.load_assistants()
+      elif self.backend == "chat":
+          self.chat_backend = ChatCompletionsBackend(self.client, model, self.system_prompt, self.logger)
+      else:
+          raise ValueError(f"Unknown generation backend: {backend}")
+      # "job" starts a fresh thread for every letter, "agent" keeps one thread for the Agent's lifetime
+      self.thread_scope = thread_scope
+      self.max_prompt_tokens = max_prompt_tokens
+      self.thread = None
+      self.open_thread_ids = []
+      self.task_finished = False
+      self.last_markdown = None
+      self.run_waiter = RunWaiter(self.client, self.logger, deadline=run_deadline)
+
+  def load_assistants(self):
+        self.assistant_no_tools = self.registry.get_or_create(
             name="Advanced Cover Letter Generator Agent",
+            model=self.model,
             instructions=self.system_prompt,
-            model=model,
             tools=[]
         )
-      self.system_prompt_2 = self.system_prompt + " 9. Use tools to formalize and submit the document in pdf, Make SURE THAT ONCE THE TASK IS FINISHED YOU USE THE FINISH TASK TOOL "
-      self.assistant_with_tools = self.client.beta.assistants.create(
-          name="Cover Letter Generator Agent (With Tools)",
-          instructions=self.system_prompt_2,  # Add your own instructions here
-          model=model,
-          tools=[
-              {"type": "function", "function": {"name": "file_operations", "description": "Performs file operations like read, write, list, or delete", "parameters": {"type": "object", "properties": {"operation": {"type": "string", "enum": ["read", "write", "list", "delete"], "description": "The operation to perform"}, "path": {"type": "string", "description": "The file or directory path"}, "content": {"type": "string", "description": "Content to write (for write operation)"}}, "required": ["operation", "path"]}}},
-              {"type": "function", "function": {"name": "markdown_to_pdf", "description": "Converts markdown content to PDF and saves it as cover.pdf in the current directory", "parameters": {"type": "object", "properties": {"markdown_content": {"type": "string", "description": "The markdown content to convert"}}, "required": ["markdown_content"]}}},
-              {"type": "function", "function": {"name": "finish_task", "description": "Signals that the current task is finished", "parameters": {"type": "object", "properties": {"message": {"type": "string", "description": "A message summarizing task completion"}}, "required": ["message"]}}},
-          ]
-      )
-      self.thread = None
-      self.task_finished = False
+        self.assistant_with_tools = self.registry.get_or_create(
+            name="Cover Letter Generator Agent (With Tools)",
+            model=self.model,
+            instructions=self.system_prompt_2,  # Add your own instructions here
+            tools=self.tools
+        )
 
   def log_and_print(self, message):
         timestamp = get_timestamp()
@@ -157,26 +387,109 @@ class Agent:
         except Exception as e:
             return f"Error in file operation: {str(e)}"
 
-  def markdown_to_pdf(self, markdown_content):
-        output_path = "cover.pdf"
-        try:
-            # Remove empty fields enclosed in brackets, including bolded ones
-            cleaned_content = re.sub(r'\*?\*\[.*?\]\*?\*', '', markdown_content)
-            cleaned_content = re.sub(r'\[.*?\]', '', cleaned_content)
+  def clean_markdown(self, markdown_content):
+        # Remove empty fields enclosed in brackets, including bolded ones
+        cleaned_content = re.sub(r'\*?\*\[.*?\]\*?\*', '', markdown_content)
+        cleaned_content = re.sub(r'\[.*?\]', '', cleaned_content)
 
-            # Remove any remaining empty lines
-            #cleaned_content = '\n'.join([line for line in cleaned_content.split('\n') if line.strip()])
+        # Remove any remaining empty lines
+        #cleaned_content = '\n'.join([line for line in cleaned_content.split('\n') if line.strip()])
+        return cleaned_content
 
-            html_content = markdown.markdown(cleaned_content)
-            # Use UTF-8 encoding for pdfkit
-            pdfkit.from_string(html_content, output_path, options={'encoding': "UTF-8"})
-            return f"Successfully created PDF at {output_path}"
-        except Exception as e:
-            return f"Error in creating PDF: {str(e)}"
+  def markdown_to_pdf(self, markdown_content):
+        # Tool call from the assistant: only keep the final markdown, the PDF is
+        # rendered later and only if a form step actually uploads it
+        self.last_markdown = self.clean_markdown(markdown_content)
+        return "Successfully created PDF at cover.pdf"
 
-  def autobot(self, initial_input=None):
+  def handle_tool_calls(self, tool_calls):
+        tool_outputs = []
+        for tool_call in tool_calls:
+            function_name = tool_call.function.name
+            function_args = json.loads(tool_call.function.arguments)
+
+            if function_name == "file_operations":
+                output = self.file_operations(**function_args)
+            elif function_name == "markdown_to_pdf":
+                output = self.markdown_to_pdf(**function_args)
+            elif function_name == "finish_task":
+                self.task_finished = True
+                output = f"Task finished: {function_args['message']}"
+            else:
+                output = f"Unknown function: {function_name}"
+
+            self.log_and_print(f"Executing {function_name}: {function_args}")
+            self.log_and_print(f"Output: {output}")
+
+            tool_outputs.append({
+                "tool_call_id": tool_call.id,
+                "output": output
+            })
+        return tool_outputs
+
+  def generate(self, initial_input):
+        # Returns the cover letter's markdown, or None on failure
+        self.last_markdown = None
+        if self.backend == "chat":
+            try:
+                markdown_content = self.chat_backend.generate(initial_input)
+            except Exception as e:
+                self.log_and_print(f"An error occurred: {str(e)}")
+                return None
+            self.last_markdown = self.clean_markdown(markdown_content)
+        else:
+            self.autobot(initial_input)
+        return self.last_markdown
+
+  def end_thread(self):
+        # Deletes every thread this Agent opened that is still around, including the current one
+        for thread_id in list(self.open_thread_ids):
+            try:
+                self.client.beta.threads.delete(thread_id)
+                self.open_thread_ids.remove(thread_id)
+            except NotFoundError:
+                self.open_thread_ids.remove(thread_id)
+            except Exception as e:
+                self.log_and_print(f"Error deleting thread {thread_id}: {str(e)}")
+        self.thread = None
+
+  def async_backend(self, client=None):
+        # Chat completions backend for the asyncio applier, with this Agent's prompt and logger
+        return AsyncChatCompletionsBackend(client or AsyncOpenAI(api_key=self.api_key), self.model, self.system_prompt, self.logger)
+
+  def usage_report(self):
+        if self.backend == "chat":
+            prompt_tokens = [entry["prompt_tokens"] for entry in self.chat_backend.history]
+        else:
+            prompt_tokens = [entry["prompt_tokens"] for entry in self.run_waiter.history]
+        total = sum(prompt_tokens)
+        return {
+            "calls": len(prompt_tokens),
+            "prompt_tokens": total,
+            "avg_prompt_tokens": total / len(prompt_tokens) if prompt_tokens else 0.0,
+            "last_prompt_tokens": prompt_tokens[-1] if prompt_tokens else 0
+        }
+
+  def forget_deleted_assistants(self):
+        # A 404 can come from a deleted thread or run as well; only drop an assistant the API says is gone
+        deleted = False
+        for assistant in (self.assistant_no_tools, self.assistant_with_tools):
+            try:
+                self.client.beta.assistants.retrieve(assistant.id)
+            except NotFoundError:
+                self.log_and_print(f"Assistant {assistant.id} was deleted remotely, creating it again")
+                self.registry.invalidate(assistant.id)
+                deleted = True
+            except Exception as e:
+                self.log_and_print(f"Could not check assistant {assistant.id}: {str(e)}")
+        if deleted:
+            self.load_assistants()
+
+  def autobot(self, initial_input=None, retry=True):
+    retry_letter = False
     if not self.thread:
         self.thread = self.client.beta.threads.create()
+        self.open_thread_ids.append(self.thread.id)
 
     self.log_and_print("Cover Letter Generator Agent is running. Type 'exit' to quit.")
 
@@ -185,22 +498,6 @@ class Agent:
     else:
         user_input = input("You: ")
 
-    # Automatic message to double-check the cover letter after the initial input
-    double_check_message = """
-        Please review the initial cover letter draft. Analyze and critique it based on the following criteria:
-        - Is the cover letter appropriate for the job?
-        - Are there any improvements that can be made in terms of language, structure, or content?
-        - Are all facts accurate?
-        - Is the formatting for markdown correctly done?
-        - Is the formatting ATS-friendly and visually appealing?
-        - Could any more appropriate skills or achievements be added?
-        - Is all the information factual, Additionally have you matched the right project to the right qualification?
-        - Have you used the right keywords and phrases? 
-        - Does it sound human and not robotic? Natural and proffesional
-
-        After analyzing, implement the improvements required and finalize the document.
-    """
-
     try:
         self.log_and_print(f"User: {user_input}")
         self.client.beta.threads.messages.create(
@@ -210,93 +507,36 @@ class Agent:
         )
 
         # Run the assistant for the first draft (without tool access)
-        run = self.client.beta.threads.runs.create(
-            thread_id=self.thread.id,
-            assistant_id=self.assistant_no_tools.id
-        )
-
-        # Wait for the assistant to finish the first draft
-        while run.status not in ["completed", "failed"]:
-            run = self.client.beta.threads.runs.retrieve(
-                thread_id=self.thread.id,
-                run_id=run.id
-            )
+        run_kwargs = {"max_prompt_tokens": self.max_prompt_tokens} if self.max_prompt_tokens else {}
+        run = self.run_waiter.run(self.thread.id, self.assistant_no_tools.id, **run_kwargs)
+        if run.status != "completed":
+            self.log_and_print(f"First draft run ended with status '{run.status}'")
+            return
 
-        # Fetch the first assistant message (cover letter draft)
-        messages = self.client.beta.threads.messages.list(thread_id=self.thread.id)
+        # Fetch the newest assistant message (cover letter draft)
+        messages = self.client.beta.threads.messages.list(thread_id=self.thread.id, order="desc", limit=1)
         first_draft = ""
-        for message in reversed(messages.data):
+        for message in messages.data:
             if message.role == "assistant":
                 first_draft = message.content[0].text.value
                 self.log_and_print(f"Assistant (First Draft): {first_draft}")
                 break
 
         # Automatically send the double-check message
-        self.log_and_print(f"Sending automatic double-check request: {double_check_message}")
+        self.log_and_print(f"Sending automatic double-check request: {DOUBLE_CHECK_MESSAGE}")
         self.client.beta.threads.messages.create(
             thread_id=self.thread.id,
             role="user",
-            content=double_check_message
+            content=DOUBLE_CHECK_MESSAGE
         )
 
         # Now, the assistant will critique and suggest improvements (WITH tool access)
-        run = self.client.beta.threads.runs.create(
-            thread_id=self.thread.id,
-            assistant_id=self.assistant_with_tools.id
-        )
-
-        tool_outputs = []
-        expected_tool_call_ids = set()
-
-        # Wait for the assistant to critique and suggest changes
-        while run.status not in ["completed", "failed"]:
-            run = self.client.beta.threads.runs.retrieve(
-                thread_id=self.thread.id,
-                run_id=run.id
-            )
-
-            # Execute tool calls after critique, as tools are now enabled
-            if run.status == "requires_action":
-                tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                expected_tool_call_ids = set(tool_call.id for tool_call in tool_calls)
-                
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-
-                    if function_name == "file_operations":
-                        output = self.file_operations(**function_args)
-                    elif function_name == "markdown_to_pdf":
-                        output = self.markdown_to_pdf(**function_args)
-                    elif function_name == "finish_task":
-                        self.task_finished = True
-                        output = f"Task finished: {function_args['message']}"
-                    else:
-                        output = f"Unknown function: {function_name}"
-
-                    self.log_and_print(f"Executing {function_name}: {function_args}")
-                    self.log_and_print(f"Output: {output}")
-
-                    tool_outputs.append({
-                        "tool_call_id": tool_call.id,
-                        "output": output
-                    })
-
-                # Filter tool outputs to only include expected call IDs
-                filtered_tool_outputs = [
-                    output for output in tool_outputs 
-                    if output["tool_call_id"] in expected_tool_call_ids
-                ]
-
-                # Submit the tool outputs after all tools have been run
-                self.client.beta.threads.runs.submit_tool_outputs(
-                    thread_id=self.thread.id,
-                    run_id=run.id,
-                    tool_outputs=filtered_tool_outputs
-                )
-
-                # Clear tool outputs after submission
-                tool_outputs = []
+        run = self.run_waiter.run(self.thread.id, self.assistant_with_tools.id, tool_handler=self.handle_tool_calls, **run_kwargs)
+        if run.status != "completed":
+            self.log_and_print(f"Review run ended with status '{run.status}'")
+        if self.last_markdown is None and first_draft:
+            # The reviewer never handed over a final version, fall back to the draft
+            self.last_markdown = self.clean_markdown(first_draft)
 
         # Fetch all messages after the second agent has completed
         messages = self.client.beta.threads.messages.list(thread_id=self.thread.id)
@@ -319,6 +559,13 @@ class Agent:
         else:
             return
 
+    except NotFoundError as e:
+        # The thread, a run or an assistant went away; start on a new thread and try the letter once more
+        self.log_and_print(f"An error occurred: {str(e)}")
+        self.forget_deleted_assistants()
+        self.thread = None
+        retry_letter = retry and initial_input is not None and self.last_markdown is None
+
     except Exception as e:
         self.log_and_print(f"An error occurred: {str(e)}")
         if not initial_input:
@@ -326,5 +573,13 @@ class Agent:
         else:
             return
 
+    finally:
+        self.log_and_print(f"Prompt token usage: {self.usage_report()}")
+        if self.thread_scope == "job":
+            self.end_thread()
+
+    if retry_letter:
+        self.autobot(initial_input, retry=False)
+
                 
             
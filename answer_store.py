@@ -0,0 +1,155 @@
+import re
+import time
+import threading
+
+
+def normalize_question(label):
+    # "Are you legally authorised to work in the UK? *" and "are you legally authorised to work in the uk"
+    # are the same question
+    label = re.sub(r"\brequired\b", " ", label.lower())
+    return " ".join(re.findall(r"[a-z0-9]+", label))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+# Words that never decide what a question asks. "not", "no" and the like are deliberately missing.
+STOPWORDS = {"a", "an", "the", "do", "does", "you", "your", "are", "is", "of", "to", "in", "on", "for", "with",
+             "have", "has", "please", "what", "which", "this", "that", "any"}
+
+
+def spelling_variant(a, b):
+    # "authorised" and "authorized", "licence" and "license", "year" and "years"; short words such as
+    # "uk" and "us" and words with a different start ("eligible", "ineligible") never are
+    return a[:3] == b[:3] and min(len(a), len(b)) >= 4 and dice(trigrams(a), trigrams(b)) >= 0.6
+
+
+class QuestionIndex:
+    # Fuzzy lookup of question labels. Exact matches on the normalized label are a dict lookup;
+    # otherwise candidates sharing a character trigram with the query are scored by trigram Dice.
+    # When the two questions differ in a word that is neither a stopword nor a spelling variant
+    # ("in the UK" and "in the US"), the score is capped by the overlap of their non-stopwords, so
+    # one deciding word is enough to keep two questions apart.
+    def __init__(self):
+        self.keys = {}
+        self.grams = {}
+        self.postings = {}
+
+    def add(self, question, value):
+        if question not in self.keys:
+            grams = trigrams(question)
+            self.grams[question] = grams
+            for gram in grams:
+                self.postings.setdefault(gram, set()).add(question)
+        self.keys[question] = value
+
+    def get(self, question):
+        return self.keys.get(question)
+
+    def match(self, question):
+        # Returns (key, value, score) of the closest stored question, or (None, None, 0.0)
+        if question in self.keys:
+            return question, self.keys[question], 1.0
+        grams = trigrams(question)
+        shared = {}
+        for gram in grams:
+            for candidate in self.postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        best, best_score = None, 0.0
+        tokens = set(question.split())
+        for candidate, count in shared.items():
+            score = 2 * count / (len(grams) + len(self.grams[candidate]))
+            candidate_tokens = set(candidate.split())
+            if self.deciding_difference(tokens, candidate_tokens):
+                words, candidate_words = tokens - STOPWORDS, candidate_tokens - STOPWORDS
+                score = min(score, len(words & candidate_words) / len(words | candidate_words))
+            if score > best_score:
+                best, best_score = candidate, score
+        return (best, self.keys[best], best_score) if best else (None, None, 0.0)
+
+    @staticmethod
+    def deciding_difference(tokens, other_tokens):
+        for words, others in ((tokens - other_tokens, other_tokens - tokens), (other_tokens - tokens, tokens - other_tokens)):
+            for word in words:
+                if word not in STOPWORDS and not any(spelling_variant(word, other) for other in others):
+                    return True
+        return False
+
+
+class AnswerBook:
+    # Question -> answer memory shared by all workers. Answers used on a form are held per application
+    # and only written to the job store once that application is submitted, so a guess that got a form
+    # stuck is never learned. Lookups below `threshold` similarity count as misses.
+    def __init__(self, job_store, threshold=0.85):
+        self.job_store = job_store
+        self.threshold = threshold
+        self.index = {}
+        self.pending = {}
+        self.lookups = 0
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.learned = 0
+        self.lookup_seconds = 0.0
+        self._lock = threading.Lock()
+        for question, kind, answer, label, uses in job_store.stored_answers():
+            self._index(kind).add(question, answer)
+
+    def _index(self, kind):
+        if kind not in self.index:
+            self.index[kind] = QuestionIndex()
+        return self.index[kind]
+
+    def lookup(self, label, kind, choices=None):
+        # The remembered answer for a question, or None; with choices, the answer must be one of them
+        question = normalize_question(label)
+        if not question:
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            _, answer, score = self._index(kind).match(question)
+            self.lookups += 1
+            if answer is not None and score >= self.threshold and choices is not None:
+                answer = next((choice for choice in choices if normalize_question(choice) == normalize_question(answer)), None)
+            hit = answer is not None and score >= self.threshold
+            if hit:
+                self.hits += 1
+                self.fuzzy_hits += score < 1.0
+            self.lookup_seconds += time.perf_counter() - started
+        return answer if hit else None
+
+    def remember(self, application_id, label, kind, answer):
+        question = normalize_question(label)
+        if application_id and question:
+            with self._lock:
+                self.pending.setdefault(application_id, {})[(question, kind)] = (str(answer), label)
+
+    def confirm(self, application_id):
+        with self._lock:
+            answers = self.pending.pop(application_id, {})
+            for (question, kind), (answer, label) in answers.items():
+                if self._index(kind).get(question) != answer:
+                    self.learned += 1
+                self._index(kind).add(question, answer)
+                self.job_store.save_answer(question, kind, answer, label)
+
+    def discard(self, application_id):
+        with self._lock:
+            self.pending.pop(application_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "questions": sum(len(index.keys) for index in self.index.values()),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "hit_rate": round(self.hits / self.lookups, 2) if self.lookups else 0.0,
+                "learned": self.learned,
+                "avg_lookup_us": round(self.lookup_seconds / self.lookups * 1e6, 1) if self.lookups else 0.0
+            }
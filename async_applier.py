@@ -0,0 +1,1202 @@
+import json
+import time
+import random
+import asyncio
+import threading
+from pathlib import Path
+from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from cover_letters import CoverLetterCache
+from cv_store import CVStore, estimate_tokens, format_sections
+from job_store import JobStore
+from answer_store import AnswerBook
+from request_policy import RequestPolicy
+from session import stored_session, cookie_session, check_session_async
+from browser_daemon import daemon_endpoint
+from form_plan import (
+    FORM_SNAPSHOT_JS, APPLY_FIELD_VALUES_JS, DIVERSITY_DROPDOWNS, field_selector, has_diversity_section,
+    is_default_option_text, plan_form_step, plan_unknown_fields
+)
+from pdf_render import get_renderer
+from sel import (
+    make_agent, LINKEDIN_EMAIL, LINKEDIN_PASSWORD, OPENAI_API_KEY, COVER_LETTER_BACKEND, COVER_PREFETCH_WORKERS, LETTER_MODEL, LETTER_SETTINGS,
+    BASE_DIR, CV_PATH, COVER_LETTER_PATH, USER_DATA_PATH, STATE_FILE_PATH, COVER_CACHE_DIR, CV_CACHE_PATH, JOB_DB_PATH, CV_TOKEN_BUDGET, CV_TOP_K,
+    PDF_RENDERER, MAX_LOGIN_ATTEMPTS, FORM_FILL_MODE, ANSWER_MATCH_THRESHOLD, REQUEST_BLOCKING, HEADLESS, BROWSER_DAEMON, FIXED_PAGE_SLEEP_SECONDS,
+    PAGINATION_MODE, JOB_CARDS_READY_JS, JOB_CARDS_EXTRACT_JS, RESULTS_PREFETCH_JS, next_results_url
+)
+
+# The browser and cover letter engine that pipeline.py's stages run on. One browser and one
+# logged-in context hold a search page, which scrapes and filters results, and a worker page per
+# apply worker, which opens and applies to the jobs queued for it. Cover letters come from an
+# AsyncOpenAI client (COVER_LETTER_BACKEND=chat) or from the sync Assistants flow on a thread, and
+# PDFs render on a thread, so scraping, letter generation, rendering and form filling overlap
+# instead of taking turns. The job store is SQLite, so its writes run on threads too.
+
+
+async def safe_navigate(page, url):
+    try:
+        await page.goto(url)
+        await page.wait_for_load_state('domcontentloaded')
+    except Exception as e:
+        print(f"Error navigating to {url}: {str(e)}")
+
+
+async def inner_text_or(page, selector, default=None):
+    element = await page.query_selector(selector)
+    return await element.inner_text() if element else default
+
+
+async def read_details(page, card):
+    # The job's details pane, read in one go rather than one element after another
+    job_title, apply_text, job_description = await asyncio.gather(
+        inner_text_or(page, '.job-details-jobs-unified-top-card__job-title', "Unknown Title"),
+        inner_text_or(page, 'button.jobs-apply-button span.artdeco-button__text', ""),
+        inner_text_or(page, '.jobs-description-content__text', "No description available")
+    )
+    return {
+        "job_id": card["job_id"] or "Unknown ID",
+        "job_title": card["title"] or job_title,
+        "company": card["company"],
+        "location": card["location"],
+        "link": card["link"],
+        "easy_apply": 'Easy Apply' in apply_text,
+        "job_description": job_description
+    }
+
+
+class AsyncLinkedInJobApplier:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.results_page = None
+        self.search_url = None
+        self.prefetched_url = None
+        self.attached_to_daemon = False
+        self.daemon_pages = []
+        self.logged_in = False
+        self.cv_store = CVStore(CV_PATH, CV_CACHE_PATH, self.extract_text_from_pdf)
+        self.pdf_renderer = get_renderer(PDF_RENDERER)
+        self.cover_cache = CoverLetterCache(COVER_CACHE_DIR, render=self.pdf_renderer.render, settings=LETTER_SETTINGS)
+        self.job_store = JobStore(JOB_DB_PATH, legacy_paths=(BASE_DIR / "failed_applications.json", BASE_DIR / "job_state.json"))
+        self.answer_book = AnswerBook(self.job_store, ANSWER_MATCH_THRESHOLD)
+        self.request_policy = RequestPolicy(REQUEST_BLOCKING)
+        if COVER_LETTER_BACKEND not in ("assistants", "chat"):
+            raise ValueError(f"Unknown generation backend: {COVER_LETTER_BACKEND}")
+        self.letter_agent = None
+        self.letter_backend = None
+        self.agents = []
+        self._local = threading.local()
+        self._agents_lock = threading.Lock()
+        self.letter_slots = None
+        self.letter_tasks = {}
+        self.letter_counts = {"hits": 0, "waits": 0, "misses": 0}
+        self.wait_metrics = []
+        self.page_stats = []
+        self.apply_workers = []
+        self.job_title = None
+
+        try:
+            with open(USER_DATA_PATH) as f:
+                self.user_data = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"User data file not found at {USER_DATA_PATH}. Please create one using the template in README.md")
+
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        # COVER_PREFETCH_WORKERS letters are written at once; the others wait their turn
+        self.letter_slots = asyncio.Semaphore(max(1, COVER_PREFETCH_WORKERS))
+
+    def extract_text_from_pdf(self, pdf_filename):
+        pdf_path = Path(pdf_filename)
+        if not pdf_path.exists():
+            print(f"Error: The file '{pdf_path}' does not exist.")
+            return None
+
+        try:
+            import PyPDF2
+            with open(pdf_path, 'rb') as pdf_file:
+                pdf_reader = PyPDF2.PdfReader(pdf_file)
+                extracted_text = ""
+                for page in pdf_reader.pages:
+                    extracted_text += page.extract_text()
+                return extracted_text
+        except Exception as e:
+            print(f"An error occurred while processing the PDF: {str(e)}")
+            return None
+
+    # Cover letters
+
+    def backend(self):
+        if self.letter_backend is None:
+            from agent import Agent
+            self.letter_agent = Agent(api_key=OPENAI_API_KEY, model=LETTER_MODEL, backend="chat")
+            self.letter_backend = self.letter_agent.async_backend()
+        return self.letter_backend
+
+    async def chat_letter(self, prompt):
+        markdown_content = await self.backend().generate(prompt)
+        return self.letter_agent.clean_markdown(markdown_content) if markdown_content else None
+
+    def assistants_letter(self, prompt):
+        # The Assistants flow is sync and keeps per-letter state, so each thread gets its own Agent
+        if not hasattr(self._local, "agent"):
+            self._local.agent = make_agent()
+            with self._agents_lock:
+                self.agents.append(self._local.agent)
+        return self._local.agent.generate(prompt)
+
+    def cv_prompt(self, job_id, job_desc, cv):
+        if CV_TOKEN_BUDGET <= 0:
+            return cv
+        # Only send the parts of the CV that matter for this job
+        selected = self.cv_store.relevant_sections(job_desc, CV_TOKEN_BUDGET, CV_TOP_K)
+        if not selected:
+            print(f"No CV section matches job ID {job_id}, sending the whole CV")
+            return cv
+        cv_prompt = format_sections(selected)
+        print(f"Selected {len(selected)} CV sections for job ID {job_id} (~{estimate_tokens(cv_prompt)} of ~{estimate_tokens(cv)} tokens):")
+        for section, text, score in selected:
+            print(f"  [{score:.2f}] {section}: {text[:80]}")
+        return cv_prompt
+
+    async def generate_cover_letter(self, job):
+        # Returns the cached CoverLetter or None. The cache's per-key lock is held on a worker thread
+        # while the letter is written, so a job (or another with the same description) is only sent
+        # to OpenAI once, even when two tasks ask for it at the same time
+        loop = asyncio.get_running_loop()
+        cv = await asyncio.to_thread(self.cv_store.text)
+        if cv is None:
+            return None
+        job_id = job["job_id"]
+        job_desc = job["job_title"] + job["job_description"]
+
+        def generate():
+            prompt = f"Create me a cover letter for the following job description {job_desc} using the cv {self.cv_prompt(job_id, job_desc, cv)}"
+            if COVER_LETTER_BACKEND == "assistants":
+                return self.assistants_letter(prompt)
+            return asyncio.run_coroutine_threadsafe(self.chat_letter(prompt), loop).result()
+
+        async with self.letter_slots:
+            return await asyncio.to_thread(
+                self.cover_cache.get_or_create,
+                self.cover_cache.make_key(job_id, job_desc, cv),
+                generate,
+                job_id,
+                self.cover_cache.make_content_key(job_desc, cv)
+            )
+
+    def prefetch_cover_letter(self, job):
+        # One task per job: started early, awaited by whichever form step needs the letter first
+        if job["job_id"] not in self.letter_tasks:
+            self.letter_tasks[job["job_id"]] = asyncio.create_task(self.generate_cover_letter(job))
+        return self.letter_tasks[job["job_id"]]
+
+    async def create_cover_letter(self, job):
+        task = self.letter_tasks.get(job["job_id"])
+        if task is None:
+            self.letter_counts["misses"] += 1
+        elif task.done():
+            self.letter_counts["hits"] += 1
+        else:
+            self.letter_counts["waits"] += 1
+        try:
+            letter = await self.prefetch_cover_letter(job)
+        except Exception as e:
+            print(f"Failed to create cover letter for job ID {job['job_id']}: {str(e)}")
+            return None
+        if letter:
+            print(f"Cover letter ready for job ID {job['job_id']} (cache: {self.cover_cache.stats()})")
+        else:
+            print(f"Failed to create cover letter for job ID {job['job_id']}")
+        print(f"Cover letter prefetch: {self.letter_stats()}")
+        return letter
+
+    def letter_stats(self):
+        # hits were ready when a form asked, waits were still being written, misses were never started early
+        return {
+            "queue_depth": sum(1 for task in self.letter_tasks.values() if not task.done()),
+            "submitted": len(self.letter_tasks),
+            **self.letter_counts
+        }
+
+    # Login
+
+    async def handle_consent(self):
+        try:
+            consent_button = await self.page.query_selector('button[action-type="ACCEPT"]')
+            if consent_button:
+                await consent_button.click()
+                print("Clicked consent button")
+        except Exception as e:
+            print(f"Error handling consent: {str(e)}")
+
+    async def check_login_status(self):
+        await safe_navigate(self.page, "https://www.linkedin.com/feed/")
+        try:
+            await self.page.wait_for_selector('div[data-test-id="nav-bar"], div[data-control-name="nav.settings"], '
+                                              'div.feed-shared-update-v2, form.login__form', timeout=5000)
+        except PlaywrightTimeoutError:
+            pass
+        nav_bar, profile_button, feed_content = await asyncio.gather(
+            self.page.query_selector('div[data-test-id="nav-bar"]'),
+            self.page.query_selector('div[data-control-name="nav.settings"]'),
+            self.page.query_selector('div.feed-shared-update-v2')
+        )
+        if nav_bar or profile_button or feed_content:
+            print("User is logged in (Feed page check).")
+            return True
+        print("User might not be logged in or feed page didn't load properly.")
+        print("Current URL:", self.page.url)
+        if await self.page.query_selector('form.login__form'):
+            print("Login form detected. User is not logged in.")
+            return False
+        print("Unable to determine login status conclusively. Assuming logged in.")
+        return True
+
+    async def login(self):
+        print("Navigating to LinkedIn login page...")
+        await safe_navigate(self.page, "https://www.linkedin.com/login")
+        await asyncio.sleep(2)
+        if self.page.url != "https://www.linkedin.com/login":
+            print("Already logged in.")
+            return True
+        print("Logging in...")
+        await self.handle_consent()
+        print("Filling in credentials...")
+        await self.page.fill("#username", LINKEDIN_EMAIL)
+        await self.page.fill("#password", LINKEDIN_PASSWORD)
+        print("Clicking login button...")
+        await self.page.click('button[type="submit"]')
+        return await self.check_login_status()
+
+    async def open_browser(self, storage_state=None):
+        endpoint = daemon_endpoint() if BROWSER_DAEMON else None
+        if endpoint:
+            started = time.monotonic()
+            self.browser = await self.playwright.chromium.connect_over_cdp(endpoint)
+            self.context = self.browser.contexts[0]
+            self.attached_to_daemon = True
+            self.page = await self.new_page()
+            print(f"Attached to the browser daemon in {(time.monotonic() - started) * 1000:.0f}ms")
+            return
+        if BROWSER_DAEMON:
+            print("Browser daemon is not running, launching a browser")
+        self.browser = await self.playwright.chromium.launch(headless=HEADLESS)
+        self.context = await self.request_policy.attach_async(await self.browser.new_context(storage_state=storage_state))
+        self.page = await self.context.new_page()
+
+    async def new_page(self):
+        # Pages in the daemon's shared context are routed and closed one by one
+        page = await self.context.new_page()
+        if self.attached_to_daemon:
+            self.daemon_pages.append(await self.request_policy.attach_async(page))
+        return page
+
+    async def ensure_login(self):
+        # The saved cookies are checked offline first, then with one API request; the feed page is
+        # only loaded when the request cannot tell
+        session = stored_session(STATE_FILE_PATH)
+        await self.open_browser(STATE_FILE_PATH if session == "valid" else None)
+        if self.attached_to_daemon:
+            session = cookie_session(await self.context.cookies())
+        if session == "valid":
+            valid = await check_session_async(self.context)
+            if valid is None:
+                valid = await self.check_login_status()
+            if valid:
+                self.logged_in = True
+                print(f"Successfully logged in using saved state! ({time.monotonic() - self.started:.2f}s after start)")
+                return
+            print("Saved session was rejected. Logging in again...")
+        else:
+            print(f"Saved session is {session}. Logging in...")
+
+        for attempt in range(MAX_LOGIN_ATTEMPTS):
+            print(f"Login attempt {attempt + 1} of {MAX_LOGIN_ATTEMPTS}")
+            if await self.login():
+                self.logged_in = True
+                print(f"Successfully logged in on attempt {attempt + 1}!")
+                await self.context.storage_state(path=STATE_FILE_PATH)
+                return
+
+        print(f"Failed to log in after {MAX_LOGIN_ATTEMPTS} attempts.")
+        self.logged_in = False
+
+    # Search results
+
+    async def open_search(self, location=None, distance=None):
+        await safe_navigate(self.page, f"https://www.linkedin.com/jobs/search/?keywords={self.job_title}&location={location or 'United Kingdom'}")
+        if location and distance:
+            await self.apply_distance_filter(distance)
+        await self.press_easy_apply_button()
+        try:
+            # The filter click updates the URL (f_AL=true) without a navigation
+            await self.page.wait_for_url(lambda url: "f_AL=true" in url, timeout=3000)
+        except PlaywrightTimeoutError:
+            pass
+        # The filters are in the URL by now, so later pages only change its start= offset
+        self.search_url = self.page.url
+        if not any(metric["wait"] == "first_search" for metric in self.wait_metrics):
+            print(f"Time to first search: {self.record_wait('first_search', self.started, headless=HEADLESS):.2f}s")
+        await self.prefetch_page(next_results_url(self.search_url))
+
+    async def apply_distance_filter(self, distance):
+        try:
+            distance_button = await self.page.wait_for_selector("button[aria-label^='Distance filter.'][id^='ember']", timeout=2500)
+            await distance_button.click()
+            print("Clicked distance filter dropdown")
+            distance_slider = await self.page.wait_for_selector('input#distance-filter-bar-slider', timeout=5000)
+            await distance_slider.fill(str(distance))
+            print(f"Set distance to {distance}")
+            show_results_button = await self.page.wait_for_selector('button[aria-label="Apply current filter to show results"]', timeout=2500)
+            await show_results_button.click()
+            print("Clicked 'Show results' button")
+            await self.page.wait_for_timeout(1500)
+        except Exception as e:
+            print(f"Error applying distance filter: {str(e)}")
+
+    async def press_easy_apply_button(self):
+        try:
+            easy_apply_button = await self.page.wait_for_selector('button[aria-label="Easy Apply filter."][role="radio"]', state="visible", timeout=5000)
+            await easy_apply_button.click()
+            print("Easy Apply button clicked successfully.")
+        except PlaywrightTimeoutError:
+            print("Easy Apply button not found or not clickable within the timeout period.")
+        except Exception as e:
+            print(f"An error occurred while trying to click the Easy Apply button: {str(e)}")
+
+    async def read_results_page(self):
+        # Every card on the current results page, once they have rendered
+        await self.page.wait_for_selector('div.job-card-container', timeout=15000)
+        await self.load_all_job_cards()
+        return await self.extract_job_cards()
+
+    async def load_all_job_cards(self, target=25, stable_ms=800, timeout=15000):
+        # Returns as soon as the page holds `target` cards or the count has stopped changing,
+        # instead of sleeping through a fixed scroll schedule
+        started = time.monotonic()
+        try:
+            await self.page.wait_for_function(
+                JOB_CARDS_READY_JS,
+                arg={"target": target, "stableMs": stable_ms, "token": started},
+                polling=100,
+                timeout=timeout
+            )
+            result = "ready"
+        except PlaywrightTimeoutError:
+            result = "timeout"
+        count = await self.page.locator('div.job-card-container').count()
+        elapsed = self.record_wait("job_cards", started, baseline=FIXED_PAGE_SLEEP_SECONDS, result=result, count=count)
+        print(f"Loaded {count} job cards in {elapsed:.2f}s ({result}), {FIXED_PAGE_SLEEP_SECONDS - elapsed:.1f}s faster than the fixed sleeps")
+
+    async def extract_job_cards(self):
+        # One round trip for the whole list instead of several per card
+        started = time.monotonic()
+        cards = await self.page.evaluate(JOB_CARDS_EXTRACT_JS, await asyncio.to_thread(self.job_store.handled_ids))
+        elapsed = self.record_wait("card_extract", started, count=len(cards))
+        print(f"Extracted {len(cards)} job cards in {elapsed:.2f}s")
+        return cards
+
+    def card_skip_reason(self, card, badges_seen=True):
+        # Decides from the list and the job state store alone, so rejected cards are never clicked.
+        # New rejections are remembered too, so the next run skips them without re-checking, except
+        # a missing Easy Apply badge: that is only a guess from the list, so it skips the card for
+        # this run and the filter stage records it once the details pane agrees.
+        # Writes to the store, so it runs on a thread.
+        job_id = card["job_id"]
+        if self.job_store.is_handled(job_id):
+            return f"already {self.job_store.state(job_id)}"
+        title = card["title"].lower()
+        if card["applied"]:
+            self.job_store.mark(job_id, "applied", "applied outside this tool", title=card["title"])
+            return "already applied"
+        if "intern" in title or "internship" in title:
+            self.job_store.mark(job_id, "skipped", "internship", title=card["title"])
+            return "internship"
+        if badges_seen and card["title"] and not card["easy_apply"]:
+            return "no Easy Apply"
+        return None
+
+    async def open_job_details(self, card):
+        # Clicks the card when it is in this page's results list, otherwise opens the job's own page
+        job_card = await self.page.query_selector(f'div.job-card-container[data-job-id="{card["job_id"]}"]')
+        if job_card:
+            await job_card.scroll_into_view_if_needed()
+            await job_card.click()
+            await self.page.wait_for_selector('.job-details-jobs-unified-top-card__job-title', timeout=5000)
+        else:
+            await safe_navigate(self.page, card["link"] or f"https://www.linkedin.com/jobs/view/{card['job_id']}/")
+            await self.page.wait_for_selector('.job-details-jobs-unified-top-card__job-title', timeout=15000)
+
+    async def read_job_details(self, card):
+        # Opens the job on the search page and reads what the list does not show: the description and the apply button
+        await self.open_job_details(card)
+        return await read_details(self.page, card)
+
+    def record_page(self, page_number, cards, skipped):
+        self.page_stats.append({"page": page_number, "cards": cards, "skipped": skipped})
+        skip_rate = skipped / cards if cards else 0.0
+        print(f"Page {page_number}: skipped {skipped}/{cards} cards before clicking ({skip_rate:.0%})")
+        self.job_store.flush()
+
+    def record_wait(self, name, started, baseline=None, **details):
+        elapsed = time.monotonic() - started
+        self.wait_metrics.append({"wait": name, "seconds": elapsed, "baseline": baseline, **details})
+        return elapsed
+
+    def wait_report(self):
+        report = {}
+        for metric in self.wait_metrics:
+            entry = report.setdefault(metric["wait"], {"count": 0, "seconds": 0.0, "saved": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += metric["seconds"]
+            if metric["baseline"] is not None:
+                entry["saved"] += metric["baseline"] - metric["seconds"]
+        return report
+
+    async def go_to_next_page(self):
+        # Moves self.page to the next results page: the prefetched page, the start= URL, or the Next button
+        if PAGINATION_MODE == "click" or not self.search_url:
+            started = time.monotonic()
+            moved = await self.click_next_page()
+            self.record_wait("next_page_click", started, moved=moved)
+            return moved
+        moved = await self.go_to_results_page(next_results_url(self.search_url))
+        if moved:
+            await self.prefetch_page(next_results_url(self.search_url))
+        return moved
+
+    async def go_to_results_page(self, url):
+        started = time.monotonic()
+        if self.prefetched_url and self.prefetched_url == url:
+            moved = await self.swap_to_prefetched_page()
+        else:
+            moved = await self.open_results_page(url)
+        self.record_wait(f"next_page_{PAGINATION_MODE}", started, moved=moved)
+        return moved
+
+    async def open_scheduled_page(self, scheduler):
+        # Opens the scheduler's next results page and returns its search, or None once all searches are done
+        while True:
+            scheduled = scheduler.next_page()
+            if scheduled is None:
+                return None
+            search, url = scheduled
+            print(f"Searching {search.title} / {search.location}, page {search.pages + 1}")
+            if await self.go_to_results_page(url):
+                self.job_title = search.title
+                if not any(metric["wait"] == "first_search" for metric in self.wait_metrics):
+                    print(f"Time to first search: {self.record_wait('first_search', self.started, headless=HEADLESS):.2f}s")
+                return search
+            print(f"No more results for {search.title} / {search.location}")
+            scheduler.finish(search)
+
+    async def prefetch_page(self, url):
+        # Starts loading the results page that comes next on a second page; RESULTS_PREFETCH_JS
+        # renders its cards there while this page is scraped and applied from
+        if PAGINATION_MODE != "prefetch" or not url:
+            return
+        try:
+            if self.results_page is None:
+                self.results_page = await self.new_page()
+                await self.page.bring_to_front()
+            self.prefetched_url = url
+            # Only waits for the response to start, the page loads while this one is used
+            await self.results_page.goto(self.prefetched_url, wait_until="commit")
+            await self.results_page.evaluate(RESULTS_PREFETCH_JS)
+        except Exception as e:
+            print(f"Could not prefetch the next results page: {str(e)}")
+            self.prefetched_url = None
+
+    async def swap_to_prefetched_page(self):
+        try:
+            await self.results_page.wait_for_function("() => window.__resultsReady === true", polling=100, timeout=15000)
+            cards = await self.results_page.evaluate("() => window.__resultsCards")
+        except Exception as e:
+            print(f"Prefetched results page is not ready ({str(e)}), loading it here")
+            return await self.open_results_page(self.prefetched_url)
+        if not cards:
+            # Either past the last page or the page never rendered; a direct load tells which
+            return await self.open_results_page(self.prefetched_url)
+        self.page, self.results_page = self.results_page, self.page
+        await self.page.bring_to_front()
+        self.search_url = self.prefetched_url
+        self.prefetched_url = None
+        return True
+
+    async def open_results_page(self, url):
+        await safe_navigate(self.page, url)
+        try:
+            await self.page.wait_for_selector('div.job-card-container', timeout=10000)
+        except PlaywrightTimeoutError:
+            return False
+        self.search_url = url
+        return True
+
+    async def click_next_page(self):
+        try:
+            next_button = await self.page.wait_for_selector('button.artdeco-button--tertiary.jobs-search-pagination__button--next:not([disabled])', timeout=5000)
+            await next_button.scroll_into_view_if_needed()
+            await next_button.click()
+            await self.page.wait_for_load_state('domcontentloaded')
+            return True
+        except PlaywrightTimeoutError:
+            print("Next page button not found or disabled")
+            return False
+        except Exception as e:
+            print(f"Error while trying to go to the next page: {str(e)}")
+            return False
+
+    def print_run_report(self, applications=None):
+        print(f"Page readiness waits: {self.wait_report()}")
+        print(f"Job states: {self.job_store.counts()}")
+        print(f"Applications this run: {self.job_store.run_report()}")
+        print(f"Answer book: {self.answer_book.stats()}")
+        print(f"Requests: {self.request_policy.stats(applications)}")
+        self.job_store.flush()
+
+    async def close(self):
+        for task in self.letter_tasks.values():
+            task.cancel()
+        if self.letter_agent is not None:
+            print(f"Cover letter prompt token usage: {self.letter_agent.usage_report()}")
+        for agent in self.agents:
+            print(f"Cover letter prompt token usage: {agent.usage_report()}")
+            await asyncio.to_thread(agent.end_thread)
+        print(f"PDF rendering: {self.pdf_renderer.stats()}")
+        await asyncio.to_thread(self.pdf_renderer.close)
+        self.cover_cache.flush()
+        self.job_store.close()
+        if self.attached_to_daemon:
+            # Leaves the daemon's browser running for the next run
+            for page in self.daemon_pages:
+                await page.close()
+        else:
+            if self.context:
+                await self.context.close()
+            if self.browser:
+                await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+
+
+class AsyncApplyWorker:
+    # One worker page: opens queued jobs and fills in their Easy Apply forms
+    def __init__(self, applier, worker_id, page):
+        self.applier = applier
+        self.worker_id = worker_id
+        self.page = page
+        self.user_data = applier.user_data
+        self.job_store = applier.job_store
+        self.answer_book = applier.answer_book
+        self.current_application = None
+        self.job_data_list = []
+        self.stats = {"worker": worker_id, "jobs": 0, "submitted": 0, "failed": 0, "busy_seconds": 0.0}
+        self.started = time.monotonic()
+
+    async def apply(self, job):
+        job_started = time.monotonic()
+        submitted = await self.apply_to_card(job)
+        self.stats["busy_seconds"] += time.monotonic() - job_started
+        self.stats["jobs"] += 1
+        if submitted:
+            self.stats["submitted"] += 1
+        elif self.job_store.state(job["job_id"]) == "failed":
+            self.stats["failed"] += 1
+        return submitted
+
+    def report(self):
+        seconds = time.monotonic() - self.started
+        return {**self.stats, "applications_per_hour": round(self.stats["submitted"] * 3600 / seconds, 1) if seconds else 0.0}
+
+    # The job store is SQLite and flushes on some of these, so they run on a thread
+
+    async def mark(self, job_id, state, reason=None, **details):
+        await asyncio.to_thread(self.job_store.mark, job_id, state, reason, **details)
+
+    def close_application(self, outcome):
+        # Answers given on the form are only learned from applications that went through
+        self.job_store.finish_application(self.current_application, outcome)
+        if outcome == "submitted":
+            self.answer_book.confirm(self.current_application)
+        else:
+            self.answer_book.discard(self.current_application)
+        self.current_application = None
+
+    async def abandon_application(self, outcome):
+        if self.current_application:
+            await asyncio.to_thread(self.close_application, outcome)
+
+    async def record_form_step(self, step, started, outcome, detail=None):
+        if self.current_application:
+            await asyncio.to_thread(self.job_store.record_attempt, self.current_application, step, time.monotonic() - started, outcome, detail)
+
+    async def apply_to_card(self, job):
+        # `job` is what the scrape stage read from the details pane, so the page is only opened for
+        # its Easy Apply button; the details are read again only for jobs stored without the flag
+        job_id = job["job_id"] or "Unknown ID"
+        application_success = False
+        try:
+            await safe_navigate(self.page, job["link"] or f"https://www.linkedin.com/jobs/view/{job_id}/")
+            await self.page.wait_for_selector('.job-details-jobs-unified-top-card__job-title', timeout=15000)
+
+            if job["easy_apply"] is None or not job["job_description"]:
+                card = {"job_id": job_id, "title": job["job_title"], "company": job["company"],
+                        "location": job["location"], "link": job["link"]}
+                job_data = await read_details(self.page, card)
+                print(json.dumps(job_data, indent=2))
+                await self.mark(job_id, "seen", title=job_data["job_title"], company=job["company"], location=job["location"],
+                                link=job["link"], description=job_data["job_description"], easy_apply=job_data["easy_apply"])
+            else:
+                job_data = job
+            job_title = job_data["job_title"]
+            easy_apply = job_data["easy_apply"]
+            self.job_data_list.append(job_data)
+
+            if easy_apply and "intern" not in job_title.lower() and "internship" not in job_title.lower():
+                # Start the cover letter now so it is ready by the time the form asks for it
+                if self.user_data["used_cover"] == False and COVER_PREFETCH_WORKERS > 0:
+                    self.applier.prefetch_cover_letter(job_data)
+                easy_apply_button = await self.page.wait_for_selector('button.jobs-apply-button', timeout=1000)
+                await easy_apply_button.click()
+                print("Clicked Easy Apply button")
+                await self.page.wait_for_selector('div.jobs-easy-apply-content', timeout=2500)
+
+                self.current_application = await asyncio.to_thread(self.job_store.start_application, job_id)
+                application_success = await self.fill_application_form(job_data)
+                await asyncio.to_thread(self.close_application, "submitted" if application_success else "failed")
+                if application_success:
+                    await self.mark(job_id, "applied", save=True)
+                else:
+                    await self.mark(job_id, "failed", "form not submitted", save=True)
+            else:
+                print("Easy Apply button not found or job not suitable")
+                await self.mark(job_id, "skipped", "not suitable")
+
+        except PlaywrightTimeoutError as e:
+            print(f"Timeout error processing job ID {job_id}: {str(e)}")
+            await self.abandon_application("timeout")
+            await self.mark(job_id, "failed", "timeout", save=True)
+            return False
+        except Exception as e:
+            print(f"Error processing job ID {job_id}: {str(e)}")
+            await self.abandon_application("error")
+            await self.mark(job_id, "failed", "error", save=True)
+            return False
+
+        await self.page.wait_for_timeout(1000)
+        return application_success
+
+    async def fill_application_form(self, job):
+        user_data = self.user_data
+        stuck_attempts = 0
+        max_stuck_attempts = 2
+        step = 0
+
+        while True:
+            step += 1
+            step_started = time.monotonic()
+            try:
+                fill_started = time.monotonic()
+                if FORM_FILL_MODE == "probe":
+                    stuck_attempts += await self.probe_form_step(job)
+                    progress_bar = await self.page.query_selector('progress.artdeco-completeness-meter-linear__progress-element')
+                    progress_value = int(await progress_bar.get_attribute('value')) if progress_bar else None
+                else:
+                    snapshot = await self.page.evaluate(FORM_SNAPSHOT_JS)
+                    if has_diversity_section(snapshot):
+                        print("UK diversity form detected. Filling out...")
+                        await self.fill_uk_diversity_form()
+                        stuck_attempts += 1
+                        await self.try_proceed()
+                        snapshot = await self.page.evaluate(FORM_SNAPSHOT_JS)
+                    await self.run_fill_plan(plan_form_step(snapshot, user_data), job)
+                    progress_value = snapshot["progress"]
+                fill_seconds = self.applier.record_wait(f"form_fill_{FORM_FILL_MODE}", fill_started, step=step)
+                print(f"Step {step}: filled known fields in {fill_seconds:.2f}s ({FORM_FILL_MODE})")
+
+                if progress_value is None:
+                    progress_value = 0
+                    print("maybe starting page or no progress bar")
+                    await self.try_proceed()
+                    stuck_attempts += 1
+
+                result = await self.try_proceed()
+                submitted = result is True
+                if not submitted and progress_value == int(result):
+                    await self.fill_unfilled_fields()
+                    retry = await self.try_proceed()
+                    submitted = retry is True
+                    if not submitted:
+                        if int(retry) == int(result):
+                            stuck_attempts += 1
+                            print(f"Stuck attempt {stuck_attempts}/{max_stuck_attempts}")
+                        else:
+                            stuck_attempts = 0
+
+                await self.record_form_step(step, step_started, "submitted" if submitted else ("stuck" if stuck_attempts else "progress"), f"progress={progress_value} fill={fill_seconds:.2f}s")
+                if submitted:
+                    break
+                if stuck_attempts >= max_stuck_attempts:
+                    print("Failed to complete application after multiple attempts. Exiting application process.")
+                    await self.dismiss()
+                    return False
+
+            except Exception as e:
+                print(f"Error filling application form: {str(e)}")
+                await self.record_form_step(step, step_started, "error", str(e))
+                return False
+
+        print("Application process completed.")
+        try:
+            await self.dismiss()
+        except Exception:
+            print("Error closing application modal")
+        return True
+
+    async def probe_form_step(self, job):
+        # Every field helper against the page; returns 1 if a diversity step was skipped past
+        user_data = self.user_data
+        stuck = 0
+        if await self.page.query_selector('span.jobs-easy-apply-form-section__label:has-text("Equal Opportunities")'):
+            print("UK diversity form detected. Filling out...")
+            await self.fill_uk_diversity_form()
+            stuck += 1
+            await self.try_proceed()
+
+        # One helper after another: probe mode is the baseline that plan mode
+        # is measured against, and concurrent fills and clicks on one page race each other
+        await self.fill_field('select[id^="text-entity-list-form-component-formElement-"][id$="-multipleChoice"]',
+                              user_data['email'], 'email', select=True)
+        await self.fill_field('select[id^="text-entity-list-form-component-formElement-"][id$="-phoneNumber-country"]',
+                              user_data['phone_country_code'], 'phone country code', select=True)
+        await self.fill_field('input[id^="single-line-text-form-component-formElement-"][id$="-phoneNumber-nationalNumber"]',
+                              user_data['phone_number'], 'phone number')
+        await self.fill_labelled_input('input[id^="single-line-text-form-component-formElement-"][id$="-text"]', "address", user_data['address'])
+        await self.fill_labelled_input('input[id^="single-line-text-form-component-formElement-"][id$="-text"]', "headline", "Cover letter")
+        await self.fill_city(user_data['city'])
+        await self.fill_driving_license(user_data.get('driving_license', 'Prefer not to say'))
+        await self.fill_numeric_fields(user_data.get('salary', '25000'))
+        await self.fill_summary(job)
+        await self.cover_letter_check(job)
+        return stuck
+
+    async def run_fill_plan(self, plan, job):
+        # Fields are filled in order, so typeahead popups and the upload do not interleave
+        for action in plan:
+            kind, value, name = action["kind"], action["value"], action["name"]
+            try:
+                element = await self.page.query_selector(field_selector(action["id"]))
+                if not element:
+                    print(f"{name.capitalize()} field went away before it was filled")
+                    continue
+                if kind == "fill":
+                    await element.fill(value)
+                elif kind == "select":
+                    await element.select_option(value=value)
+                elif kind == "typeahead":
+                    await element.fill(value)
+                    await self.page.wait_for_selector('div.basic-typeahead__triggered-content div[role="option"]', timeout=500)
+                    await self.page.click('div.basic-typeahead__triggered-content div[role="option"]:first-child')
+                elif kind == "check":
+                    label = await self.page.query_selector("label" + field_selector(action["id"], "for"))
+                    await (label or element).click()
+                elif kind == "summary":
+                    value = await self.summary_text(job)
+                    if not value:
+                        print("No cover letter text available for summary")
+                        continue
+                    await element.fill(value)
+                elif kind == "cover_letter":
+                    await self.upload_cover_letter(element, job)
+                    continue
+                print(f"Filled {name}: {value}")
+            except Exception as e:
+                print(f"Error filling {name}: {str(e)}")
+
+    async def dismiss(self):
+        dismiss_button = await self.page.query_selector('button.artdeco-modal__dismiss')
+        if dismiss_button:
+            await dismiss_button.click()
+            print("Clicked 'Dismiss' button to close the application modal.")
+        await self.press_discard_button()
+
+    async def press_discard_button(self):
+        try:
+            discard_button = await self.page.wait_for_selector('button[data-test-dialog-secondary-btn]:has-text("Discard")', state="visible", timeout=2500)
+            await discard_button.click()
+            print("Discard button clicked successfully.")
+        except PlaywrightTimeoutError:
+            print("Discard button not found or not clickable within the timeout period.")
+
+    async def try_proceed(self):
+        buttons = [
+            ('button[aria-label="Review your application"]', "Review"),
+            ('button[aria-label="Continue to next step"]', "Next"),
+            ('button[aria-label="Submit application"]', "Submit")
+        ]
+        for selector, button_type in buttons:
+            button = await self.page.query_selector(selector)
+            if not button:
+                continue
+            await button.click()
+            print(f"Clicked '{button_type}' button.")
+            await asyncio.sleep(0.2)
+
+            if button_type in ["Review", "Next"]:
+                progress_bar = await self.page.query_selector('progress.artdeco-completeness-meter-linear__progress-element')
+                if progress_bar:
+                    progress_value = int(await progress_bar.get_attribute('value'))
+                    print(f"Progress bar value after clicking '{button_type}': {progress_value}")
+                    return progress_value
+
+            if button_type == "Submit":
+                done_button_selector = 'button.artdeco-button--primary:has-text("Done")'
+                await self.page.wait_for_selector(done_button_selector, timeout=2500)
+                done_button = await self.page.query_selector(done_button_selector)
+                if done_button:
+                    await done_button.click()
+                    print("Clicked 'Done' button. Application successfully submitted.")
+                    return True
+                print("Failed to find 'Done' button after submission.")
+                return False
+        return False
+
+    # Known fields
+
+    async def fill_field(self, selector, value, field_name, select=False):
+        try:
+            element = await self.page.wait_for_selector(selector, state="visible", timeout=1000)
+            if select:
+                await element.select_option(value=value)
+            else:
+                await element.fill(value)
+            print(f"Filled {field_name}: {value}")
+        except Exception as e:
+            print(f"Failed to fill {field_name}: {e}")
+
+    async def fill_labelled_input(self, selector, label_keyword, value):
+        # Address and headline: fill the input only if its label matches
+        try:
+            text_input = await self.page.query_selector(selector)
+            if not text_input:
+                print(f"{label_keyword.capitalize()} input field not found")
+                return
+            label = await self.page.query_selector(f'label[for="{await text_input.get_attribute("id")}"]')
+            if label and label_keyword in (await label.inner_text()).lower():
+                await text_input.fill(value)
+                print(f"Filled {label_keyword}: {value}")
+            else:
+                print(f"Found input field, but it doesn't seem to be for {label_keyword}")
+        except Exception as e:
+            print(f"Error filling {label_keyword}: {str(e)}")
+
+    async def fill_city(self, city):
+        try:
+            city_input = await self.page.wait_for_selector('input[id^="single-typeahead-entity-form-component-formElement-"][id$="-city-HOME-CITY"]',
+                                                           state="visible", timeout=500)
+            await city_input.fill(city)
+            await self.page.wait_for_selector('div.basic-typeahead__triggered-content div[role="option"]', timeout=500)
+            await self.page.click('div.basic-typeahead__triggered-content div[role="option"]:first-child')
+            print(f"Filled city: {city}")
+        except Exception as e:
+            print(f"Error filling city: {e}")
+
+    async def fill_driving_license(self, license_value):
+        try:
+            fieldset = await self.page.wait_for_selector('fieldset:has(legend)', state="visible", timeout=500)
+            legend_text = await fieldset.evaluate('(el) => el.querySelector("legend").textContent')
+            if 'driving license' not in legend_text.lower():
+                print("Driving license question not found in this fieldset")
+                return
+            for option in await fieldset.query_selector_all('label'):
+                if license_value.lower() in (await option.inner_text()).lower():
+                    await option.click()
+                    print(f"Selected driving license: {license_value}")
+                    return
+            print(f"Option '{license_value}' not found for driving license")
+        except Exception as e:
+            print(f"Error handling driving license: {e}")
+
+    async def fill_numeric_fields(self, salary_value):
+        # Years of experience and salary, over one query of the numeric inputs
+        try:
+            for numeric_input in await self.page.query_selector_all('input[id^="single-line-text-form-component-formElement-"][id$="-numeric"]'):
+                label = (await numeric_input.evaluate('(el) => el.labels[0] ? el.labels[0].textContent : ""')).strip()
+                if label.lower().startswith("how many years"):
+                    value = '2' if "python" in label.lower() else '0'
+                elif "salary" in label.lower():
+                    value = str(salary_value)
+                else:
+                    continue
+                await numeric_input.fill(value)
+                print(f"Filled '{value}' for: {label}")
+        except Exception as e:
+            print(f"Error handling numeric fields: {e}")
+
+    async def fill_summary(self, job):
+        try:
+            summary_textarea = await self.page.query_selector('textarea[id^="multiline-text-form-component-formElement-"][id$="-text"]')
+            if not summary_textarea:
+                print("Summary textarea not found")
+                return
+            label = await self.page.query_selector(f'label[for="{await summary_textarea.get_attribute("id")}"]')
+            if not (label and "summary" in (await label.inner_text()).lower()):
+                print("Found textarea, but it doesn't seem to be for summary")
+                return
+            text = await self.summary_text(job)
+            if not text:
+                print("No cover letter text available for summary")
+                return
+            await summary_textarea.fill(text)
+            print(f"Filled summary: {text}")
+        except Exception as e:
+            print(f"Error filling summary: {str(e)}")
+
+    async def cover_letter_check(self, job):
+        try:
+            await self.page.wait_for_selector('.js-jobs-document-upload__container', timeout=1000)
+            file_input = await self.page.query_selector('input[id^="jobs-document-upload-file-input-upload-cover-letter"]')
+            if not file_input:
+                print("File input not found!")
+                return
+            await self.upload_cover_letter(file_input, job)
+        except PlaywrightTimeoutError:
+            print("Container for cover letter not found.")
+        except Exception as e:
+            print(f"Error handling cover letter upload: {e}")
+
+    async def cover_letter(self, job):
+        letter = await self.applier.create_cover_letter(job)
+        if letter:
+            await asyncio.to_thread(self.job_store.add_artifact, job["job_id"], "cover_letter", letter.pdf_path.with_suffix(".md"), self.current_application)
+        return letter
+
+    async def summary_text(self, job):
+        if self.user_data["used_cover"] == False:
+            letter = await self.cover_letter(job)
+            return letter.text if letter else None
+        return await asyncio.to_thread(self.applier.extract_text_from_pdf, COVER_LETTER_PATH)
+
+    async def upload_cover_letter(self, file_input, job):
+        print("File input found. Preparing to upload cover letter...")
+        if self.user_data["used_cover"] == False:
+            letter = await self.cover_letter(job)
+            # Rendering is blocking work, keep it off the event loop
+            pdf_bytes = await asyncio.to_thread(lambda: letter.pdf_bytes) if letter else None
+            uploaded_path = letter.pdf_path if letter else None
+        elif COVER_LETTER_PATH.exists():
+            pdf_bytes = COVER_LETTER_PATH.read_bytes()
+            uploaded_path = COVER_LETTER_PATH
+        else:
+            pdf_bytes = None
+        if pdf_bytes:
+            await file_input.set_input_files({"name": COVER_LETTER_PATH.name, "mimeType": "application/pdf", "buffer": pdf_bytes})
+            print("Cover letter uploaded successfully!")
+            await asyncio.to_thread(self.job_store.add_artifact, job["job_id"], "cover_letter_pdf", uploaded_path, self.current_application)
+        else:
+            print("Cover letter not available for upload")
+
+    # UK diversity form
+
+    async def select_dropdown(self, label, key):
+        try:
+            dropdown = await self.page.query_selector(f'select[aria-describedby*="multipleChoice-error"]:near(:text("{label}"))')
+            value = self.user_data.get(key, '')
+            if not dropdown or not value:
+                return
+            success = await dropdown.evaluate("""
+                (dropdown, value) => {
+                    for (const option of dropdown.options) {
+                        if (option.text.toLowerCase().includes(value.toLowerCase())) {
+                            dropdown.value = option.value;
+                            dropdown.dispatchEvent(new Event('change', { bubbles: true }));
+                            return true;
+                        }
+                    }
+                    return false;
+                }
+            """, value)
+            print(f"{'Selected' if success else 'Failed to select'} option for '{label}'")
+        except Exception as e:
+            print(f"Error selecting dropdown for '{label}': {str(e)}")
+
+    async def select_fieldset_option(self, legend_text, value):
+        try:
+            fieldset = await self.page.query_selector(f'fieldset:has(legend:has-text("{legend_text}"))')
+            if not fieldset or not value:
+                return False
+            option = await fieldset.query_selector(f'label:has-text("{value}")')
+            if not option:
+                print(f"Option '{value}' not found for '{legend_text}', skipping...")
+                return False
+            await option.click()
+            print(f"Selected '{legend_text}': {value}")
+            return True
+        except Exception as e:
+            print(f"Error selecting checkbox for '{legend_text}': {str(e)}")
+            return False
+
+    async def fill_uk_diversity_form(self):
+        user_data = self.user_data
+        hear_about_input = await self.page.query_selector('input[id^="single-line-text-form-component-formElement-urn-li-jobs-applyformcommon-easyApplyFormElement-"][id$="-text"]')
+        if hear_about_input:
+            await hear_about_input.fill(user_data.get('hear_about_job', ''))
+            print("Filled 'How did you hear about this job?'")
+
+        disability_status = user_data.get('disability', {}).get('status', '').capitalize()
+        results = await asyncio.gather(
+            *(self.select_dropdown(label, key) for label, key in DIVERSITY_DROPDOWNS),
+            self.select_fieldset_option("Gender", user_data.get('gender', '')),
+            self.select_fieldset_option("Ethnicity", user_data.get('ethnicity', '')),
+            self.select_fieldset_option("Sexual Orientation", user_data.get('sexual_orientation', '')),
+            self.select_fieldset_option("Disability", disability_status)
+        )
+        if results[-1] and disability_status == "Yes":
+            description_input = await self.page.query_selector('textarea[aria-label="If yes, please could you describe the nature of your disability (e.g. visual impairment)"]')
+            if description_input:
+                description = user_data.get('disability', {}).get('description', '')
+                await description_input.fill(description)
+                print(f"Filled disability description: {description}")
+
+    # Anything left empty
+
+    async def fill_unfilled_fields(self):
+        started = time.monotonic()
+        if FORM_FILL_MODE == "probe":
+            await self.probe_unfilled_fields()
+        else:
+            try:
+                # One evaluation to read the step, one to write every answer
+                snapshot = await self.page.evaluate(FORM_SNAPSHOT_JS)
+                actions = plan_unknown_fields(snapshot, self.user_data, answers=self.answer_book)
+                missing = await self.page.evaluate(APPLY_FIELD_VALUES_JS, actions) if actions else []
+                for action in actions:
+                    if action["id"] not in missing:
+                        if action["learn"]:
+                            self.answer_book.remember(self.current_application, action["question"], action["answer_kind"], action["answer"])
+                        print(f"Filled unknown field {action['name']}: {action['value']}")
+            except Exception as e:
+                print(f"Error filling unknown fields: {e}")
+        elapsed = self.applier.record_wait(f"unknown_fields_{FORM_FILL_MODE}", started)
+        print(f"Unknown fields handled in {elapsed:.2f}s ({FORM_FILL_MODE})")
+
+    async def probe_unfilled_fields(self):
+        try:
+            container = await self.page.wait_for_selector('div.jobs-easy-apply-content', timeout=20000)
+            await asyncio.gather(*(self.select_dropdown(label, key) for label, key in DIVERSITY_DROPDOWNS))
+            fields = await container.query_selector_all('input:not([type="hidden"]):not([type="submit"]), select, textarea')
+            processed_radio_groups = set()
+            for field in fields:
+                field_id = None
+                try:
+                    field_type = await field.get_attribute('type') or (await field.evaluate('(el) => el.tagName')).lower()
+                    field_id = await field.get_attribute('id') or await field.get_attribute('name')
+                    await field.scroll_into_view_if_needed()
+                    if field_type in ['text', 'textarea']:
+                        if not (await field.input_value()).strip():
+                            is_numeric = 'numeric' in (field_id or '').lower() or 'number' in (field_id or '').lower()
+                            await field.fill('0' if is_numeric else 'N/A')
+                            print(f"Filled {'numeric' if is_numeric else 'text'} field: {field_id}")
+                    elif field_type == 'checkbox':
+                        await self.handle_checkbox(field, field_id)
+                    elif field_type == 'radio':
+                        await self.handle_radio_group(field, processed_radio_groups, container)
+                    elif field_type in ('select-one', 'select'):
+                        await self.handle_select_field(field, field_id)
+                except Exception as e:
+                    print(f"Error processing field {field_id}: {str(e)}")
+        except Exception as e:
+            print(f"Error filling unknown fields: {e}")
+
+    async def label_text(self, field):
+        return await field.evaluate('''
+            (el) => {
+                const label = el.labels[0] || document.querySelector(`label[for="${el.id}"]`);
+                return label ? label.textContent.trim() : '';
+            }
+        ''') or ''
+
+    async def group_label(self, field):
+        return await field.evaluate('''
+            (el) => {
+                const fieldset = el.closest('fieldset');
+                const legend = fieldset && fieldset.querySelector('legend');
+                if (legend) return legend.textContent.trim();
+                let parent = el.parentElement;
+                while (parent) {
+                    const possibleLabel = parent.querySelector('label, div[class*="label"], span[class*="label"]');
+                    if (possibleLabel) return possibleLabel.textContent.trim();
+                    parent = parent.parentElement;
+                }
+                return '';
+            }
+        ''') or ''
+
+    async def click_element_safely(self, element, timeout=10000):
+        try:
+            await element.click(timeout=timeout)
+        except PlaywrightTimeoutError:
+            print(f"Regular click failed: Timeout {timeout}ms exceeded.")
+            try:
+                await element.evaluate("(element) => element.click()")
+                print("Clicked element using JavaScript")
+            except Exception as js_e:
+                print(f"JavaScript click also failed: {str(js_e)}")
+
+    async def handle_checkbox(self, field, field_id):
+        label_text = (await self.label_text(field)).lower()
+        if "visa" in label_text or "sponsorship" in label_text:
+            if await field.is_checked():
+                await self.click_element_safely(field)
+                print(f"Unchecked visa/sponsorship checkbox: {field_id}")
+        elif not await field.is_checked() and random.choice([True, False]):
+            await self.click_element_safely(field)
+            print(f"Checked checkbox: {field_id}")
+
+    async def handle_radio_group(self, field, processed_radio_groups, container):
+        name = await field.get_attribute('name')
+        if name in processed_radio_groups:
+            return
+        processed_radio_groups.add(name)
+        radio_group = await container.query_selector_all(f'input[type="radio"][name="{name}"]')
+        group_label = (await self.group_label(radio_group[0])).lower()
+        print(f"Processing radio group: {group_label}")
+
+        if any(keyword in group_label for keyword in ["visa", "sponsorship"]):
+            target = "no"
+        elif "legally authorized" in group_label:
+            target = "yes"
+        elif any(keyword in group_label for keyword in ["commute", "relocate", "location", "commuting", "onsite", "remote", "hybrid"]):
+            target = "yes"
+        else:
+            target = None
+
+        if target:
+            labels = await asyncio.gather(*(self.label_text(radio) for radio in radio_group))
+            option = next((radio for radio, label in zip(radio_group, labels) if label.strip().lower() == target), None)
+            if option:
+                await self.click_element_safely(option)
+                print(f"Selected '{target.capitalize()}' for radio group {name}")
+            else:
+                print(f"Could not find '{target.capitalize()}' option for radio group {name}")
+        elif not any(await asyncio.gather(*(radio.is_checked() for radio in radio_group))):
+            selected_radio = random.choice(radio_group)
+            await self.click_element_safely(selected_radio)
+            print(f"Selected radio button: {await selected_radio.get_attribute('id')} from group {name}")
+        else:
+            print(f"Radio group {name} already has a selection. Skipping.")
+
+    async def handle_select_field(self, field, field_id):
+        if await field.evaluate('(el) => el.value'):
+            print(f"Select field {field_id} already has a selection. Skipping.")
+            return
+        options = await field.evaluate('(el) => Array.from(el.options).map(o => [o.value, o.textContent.trim().toLowerCase()])')
+        valid_values = [value for value, text in options if value and not is_default_option_text(text)]
+        if valid_values:
+            await field.select_option(value=random.choice(valid_values))
+            print(f"Selected option for select field: {field_id}")
+
@@ -0,0 +1,288 @@
+import os
+import time
+import sys
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pdf_render import RENDERERS, get_renderer
+
+SAMPLE_LETTER = """# Jane Doe
+jane.doe@example.com | 07123 456789 | Sheffield, UK
+
+Dear Hiring Manager,
+
+I am excited to apply for the **Graduate Software Engineer** position. During my degree I built and shipped
+several data-driven web applications, and I would love to bring that experience to your team.
+
+In my final-year project I designed a Python service that processed over one million records a day, cutting
+report generation time by 60%. I also led a team of four in an agile hackathon project that won first prize.
+
+I am drawn to your focus on reliable, well-tested software and would welcome the chance to discuss how I can
+contribute. Thank you for your time and consideration.
+
+Sincerely,
+Jane Doe
+"""
+
+
+class RequestCounter:
+    # httpx event hook counting every HTTP request the OpenAI client sends
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, request):
+        self.count += 1
+
+
+def read_pdf_text(path):
+    import PyPDF2
+    with open(path, 'rb') as pdf_file:
+        return "".join(page.extract_text() for page in PyPDF2.PdfReader(pdf_file).pages)
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+def bench_backends(args):
+    import httpx
+    from openai import OpenAI
+    from agent import Agent
+
+    cv = read_pdf_text(args.cv)
+    with open(args.job, 'r', encoding='utf-8') as f:
+        job_desc = f.read()
+    prompt = f"Create me a cover letter for the following job description {job_desc} using the cv {cv}"
+
+    rows = []
+    for backend in args.backends:
+        counter = RequestCounter()
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=httpx.Client(event_hooks={"request": [counter]}))
+        agent = Agent(model=args.model, backend=backend, client=client)
+
+        for run_number in range(args.runs):
+            # Fresh thread every time so the assistants path is not penalised by a growing context
+            agent.thread = None
+            counter.count = 0
+            runs_before = len(agent.run_waiter.history)
+            started = time.monotonic()
+            agent.generate(prompt)
+            wall_time = time.monotonic() - started
+
+            if backend == "chat":
+                entries = agent.chat_backend.history[-1:]
+            else:
+                entries = agent.run_waiter.history[runs_before:]
+            prompt_tokens = sum(entry["prompt_tokens"] for entry in entries)
+            completion_tokens = sum(entry["completion_tokens"] for entry in entries)
+            rows.append([backend, run_number + 1, f"{wall_time:.2f}", counter.count, prompt_tokens, completion_tokens])
+
+    print_table(["backend", "run", "seconds", "requests", "prompt_tokens", "completion_tokens"], rows)
+
+
+def bench_renderers(args):
+    if args.markdown:
+        with open(args.markdown, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
+    else:
+        markdown_content = SAMPLE_LETTER
+
+    rows = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in args.renderers:
+            renderer = get_renderer(name)
+            try:
+                # Warm-up render so one-off startup (e.g. launching Chromium) is reported separately
+                started = time.monotonic()
+                renderer.render(markdown_content, os.path.join(output_dir, f"{name}-warmup.pdf"))
+                startup = time.monotonic() - started
+
+                started = time.monotonic()
+                with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                    results = list(executor.map(
+                        lambda i: renderer.render(markdown_content, os.path.join(output_dir, f"{name}-{i}.pdf")),
+                        range(args.letters)
+                    ))
+                elapsed = time.monotonic() - started
+            finally:
+                renderer.close()
+            rows.append([name, f"{startup:.2f}", args.letters, results.count(False), f"{elapsed:.2f}", f"{args.letters / elapsed:.1f}"])
+
+    print_table(["renderer", "first_render_s", "letters", "failures", "seconds", "renders_per_s"], rows)
+
+
+def import_time_ms(module):
+    # Cumulative import time reported by -X importtime for the module itself, in a fresh interpreter
+    env = dict(os.environ)
+    for name in ("LINKEDIN_EMAIL", "LINKEDIN_PASSWORD", "OPENAI_API_KEY"):
+        env.setdefault(name, "benchmark")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        return None
+    for line in reversed(result.stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    return None
+
+
+def bench_imports(args):
+    rows = []
+    for module in args.modules:
+        samples = [import_time_ms(module) for _ in range(args.runs)]
+        samples = [sample for sample in samples if sample is not None]
+        if samples:
+            rows.append([module, f"{min(samples):.1f}", f"{sum(samples) / len(samples):.1f}"])
+        else:
+            rows.append([module, "failed", "failed"])
+    print_table(["module", "best_ms", "avg_ms"], rows)
+
+
+def bench_prompts(args):
+    from cv_store import CVSectionIndex, estimate_tokens, format_sections
+    if args.cv.endswith(".pdf"):
+        cv = read_pdf_text(args.cv)
+    else:
+        with open(args.cv, 'r', encoding='utf-8') as f:
+            cv = f.read()
+    index = CVSectionIndex(cv)
+    rows = []
+    for job_path in args.jobs:
+        with open(job_path, 'r', encoding='utf-8') as f:
+            job_desc = f.read()
+        # The same prompt sel.py sends, with the whole CV and with each budget's excerpt
+        whole = estimate_tokens(f"Create me a cover letter for the following job description {job_desc} using the cv {cv}")
+        row = [os.path.basename(job_path), estimate_tokens(job_desc), estimate_tokens(cv), whole]
+        for budget in args.budgets:
+            selected = index.select(job_desc, budget, args.top_k)
+            cv_prompt = format_sections(selected) if selected else cv
+            tokens = estimate_tokens(f"Create me a cover letter for the following job description {job_desc} using the cv {cv_prompt}")
+            row.append(f"{tokens} ({100 * (whole - tokens) / whole:.0f}% less, {len(selected)} sections)")
+        rows.append(row)
+    print_table(["job", "job_tokens", "cv_tokens", "whole_cv_prompt"] + [f"budget_{budget}" for budget in args.budgets], rows)
+
+
+def write_fixture_site(site_dir, images=30, image_kb=60):
+    # A results-page-shaped fixture: markup, one script and one stylesheet the flows need, and the
+    # images, web font, video and analytics calls they do not
+    os.makedirs(os.path.join(site_dir, "li"), exist_ok=True)
+    for i in range(images):
+        with open(os.path.join(site_dir, f"logo-{i}.png"), "wb") as f:
+            f.write(os.urandom(image_kb * 1024))
+    with open(os.path.join(site_dir, "font.woff2"), "wb") as f:
+        f.write(os.urandom(120 * 1024))
+    with open(os.path.join(site_dir, "promo.mp4"), "wb") as f:
+        f.write(os.urandom(800 * 1024))
+    with open(os.path.join(site_dir, "app.js"), "w") as f:
+        f.write("fetch('/li/track?event=view', {method: 'POST', body: 'x'.repeat(2048)}).catch(() => {});\n"
+                "document.body.dataset.ready = 'true';\n")
+    with open(os.path.join(site_dir, "style.css"), "w") as f:
+        f.write("@font-face { font-family: Fixture; src: url(font.woff2); } body { font-family: Fixture; }\n")
+    with open(os.path.join(site_dir, "li", "track"), "w") as f:
+        f.write("ok")
+    cards = "".join(f'<div class="job-card-container" data-job-id="{i}"><img src="logo-{i}.png"><a>Job {i}</a></div>'
+                    for i in range(images))
+    with open(os.path.join(site_dir, "index.html"), "w") as f:
+        f.write(f'<html><head><link rel="stylesheet" href="style.css"></head><body>{cards}'
+                f'<video src="promo.mp4" autoplay muted></video><script src="app.js"></script></body></html>')
+
+
+def bench_routing(args):
+    import threading
+    from functools import partial
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+    from playwright.sync_api import sync_playwright
+    from request_policy import RequestPolicy
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.do_GET()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as site_dir:
+        write_fixture_site(site_dir, args.images)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=site_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+        try:
+            with sync_playwright() as playwright:
+                browser = playwright.chromium.launch(headless=True)
+                for mode in args.modes:
+                    policy = RequestPolicy(mode)
+                    ready = []
+                    loaded = []
+                    for _ in range(args.loads):
+                        # A new context per load: routing turns the HTTP cache off, so every mode is compared cold
+                        context = policy.attach(browser.new_context())
+                        page = context.new_page()
+                        started = time.monotonic()
+                        page.goto(url, wait_until="domcontentloaded")
+                        page.wait_for_selector('body[data-ready="true"]')
+                        ready.append(time.monotonic() - started)
+                        page.wait_for_load_state("load")
+                        loaded.append(time.monotonic() - started)
+                        context.close()
+                    stats = policy.stats()
+                    rows.append([mode, args.loads, f"{sum(ready) / len(ready) * 1000:.0f}", f"{sum(loaded) / len(loaded) * 1000:.0f}",
+                                 stats["loaded"], stats["blocked"], f"{stats['loaded_mb'] / args.loads:.2f}"])
+                browser.close()
+        finally:
+            server.shutdown()
+
+    print_table(["mode", "loads", "ready_ms", "load_ms", "responses", "blocked", "mb_per_load"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the LinkedIn job applier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backends_parser = subparsers.add_parser("backends", help="Compare cover letter generation backends")
+    backends_parser.add_argument("--cv", default="cv.pdf")
+    backends_parser.add_argument("--job", required=True, help="Text file with a job description")
+    backends_parser.add_argument("--model", default="gpt-4o-mini")
+    backends_parser.add_argument("--runs", type=int, default=3)
+    backends_parser.add_argument("--backends", nargs="+", default=["assistants", "chat"])
+    backends_parser.set_defaults(func=bench_backends)
+
+    renderers_parser = subparsers.add_parser("renderers", help="Compare PDF renderers")
+    renderers_parser.add_argument("--markdown", help="Markdown file to render (defaults to a sample letter)")
+    renderers_parser.add_argument("--letters", type=int, default=20)
+    renderers_parser.add_argument("--concurrency", type=int, default=4)
+    renderers_parser.add_argument("--renderers", nargs="+", choices=list(RENDERERS), default=list(RENDERERS))
+    renderers_parser.set_defaults(func=bench_renderers)
+
+    imports_parser = subparsers.add_parser("imports", help="Measure startup import times")
+    imports_parser.add_argument("--runs", type=int, default=5)
+    imports_parser.add_argument("--modules", nargs="+", default=["sel", "agent", "openai", "PyPDF2", "pdfminer.high_level", "markdown", "pdfkit"])
+    imports_parser.set_defaults(func=bench_imports)
+
+    prompts_parser = subparsers.add_parser("prompts", help="Estimated prompt tokens with the whole CV and with the selected sections")
+    prompts_parser.add_argument("--cv", default="cv.pdf", help="CV as a PDF or a text file")
+    prompts_parser.add_argument("--jobs", nargs="+", required=True, help="Text files with job descriptions")
+    prompts_parser.add_argument("--budgets", nargs="+", type=int, default=[400, 800, 1200])
+    prompts_parser.add_argument("--top-k", type=int, default=12)
+    prompts_parser.set_defaults(func=bench_prompts)
+
+    routing_parser = subparsers.add_parser("routing", help="Compare request blocking modes on a local fixture site")
+    routing_parser.add_argument("--loads", type=int, default=10)
+    routing_parser.add_argument("--images", type=int, default=30)
+    routing_parser.add_argument("--modes", nargs="+", choices=["off", "assets", "strict"], default=["off", "assets", "strict"])
+    routing_parser.set_defaults(func=bench_routing)
+
+    args = parser.parse_args()
+    from dotenv import load_dotenv
+    load_dotenv()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+import urllib.request
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Keeps one Chromium with the signed-in LinkedIn profile running between runs. Runs started with
+# BROWSER_DAEMON=true attach to it over CDP and open a page in its context instead of starting a
+# browser, restoring the saved session and checking the login every time.
+BASE_DIR = Path(__file__).parent
+STATE_FILE_PATH = Path(os.getenv("STATE_FILE_PATH", BASE_DIR / "linkedin_state.json"))
+DAEMON_STATE_PATH = Path(os.getenv("DAEMON_STATE_PATH", BASE_DIR / "browser_daemon.json"))
+DAEMON_PROFILE_DIR = Path(os.getenv("DAEMON_PROFILE_DIR", BASE_DIR / "browser_profile"))
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "9333"))
+# Minutes without any run attached before the daemon shuts itself down
+DAEMON_IDLE_MINUTES = float(os.getenv("DAEMON_IDLE_MINUTES", "30"))
+HEADLESS = os.getenv("HEADLESS", "false").lower() in ("1", "true", "yes")
+HEALTH_CHECK_SECONDS = 15
+
+
+def cdp_version(port, timeout=1.0):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=timeout) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+def read_daemon_state():
+    try:
+        with open(DAEMON_STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def daemon_endpoint():
+    # The CDP endpoint of a running, healthy daemon, or None
+    state = read_daemon_state()
+    if state and cdp_version(state["port"]) is not None:
+        return f"http://127.0.0.1:{state['port']}"
+    return None
+
+
+def serve(port=DAEMON_PORT, idle_minutes=DAEMON_IDLE_MINUTES, headless=HEADLESS):
+    from playwright.sync_api import sync_playwright
+
+    if daemon_endpoint():
+        print(f"A browser daemon is already running: {read_daemon_state()}")
+        return
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *args: stopping.append(True))
+
+    with sync_playwright() as playwright:
+        # A persistent profile, so its default context (the one CDP clients see) survives restarts
+        context = playwright.chromium.launch_persistent_context(
+            DAEMON_PROFILE_DIR, headless=headless, args=[f"--remote-debugging-port={port}"]
+        )
+        if STATE_FILE_PATH.exists():
+            with open(STATE_FILE_PATH, 'r', encoding='utf-8') as f:
+                context.add_cookies(json.load(f).get("cookies", []))
+        keepalive = context.pages[0] if context.pages else context.new_page()
+
+        with open(DAEMON_STATE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({"pid": os.getpid(), "port": port, "started": time.time()}, f)
+        print(f"Browser daemon listening on http://127.0.0.1:{port} (idle shutdown after {idle_minutes:g} minutes)")
+
+        last_active = time.monotonic()
+        last_check = time.monotonic()
+        try:
+            while not stopping:
+                # Waiting on the page keeps Playwright's event loop turning
+                keepalive.wait_for_timeout(1000)
+                now = time.monotonic()
+                # Any page besides the keepalive belongs to an attached run
+                if len(context.pages) > 1:
+                    last_active = now
+                if now - last_check >= HEALTH_CHECK_SECONDS:
+                    last_check = now
+                    if cdp_version(port) is None or keepalive.evaluate("1 + 1") != 2:
+                        print("Health check failed, shutting down")
+                        break
+                if now - last_active >= idle_minutes * 60:
+                    print(f"Idle for {idle_minutes:g} minutes, shutting down")
+                    break
+        finally:
+            # Cookies refreshed by the runs are kept for the next start, with or without the daemon
+            try:
+                context.storage_state(path=STATE_FILE_PATH)
+            except Exception as e:
+                print(f"Could not save the session: {str(e)}")
+            context.close()
+            DAEMON_STATE_PATH.unlink(missing_ok=True)
+            print("Browser daemon stopped")
+
+
+def status():
+    state = read_daemon_state()
+    if not state:
+        print("Browser daemon is not running")
+        return False
+    version = cdp_version(state["port"])
+    if version is None:
+        print(f"Browser daemon (pid {state['pid']}) is not answering on port {state['port']}")
+        return False
+    print(f"Browser daemon running: pid {state['pid']}, port {state['port']}, {version.get('Browser')}, "
+          f"up {(time.time() - state['started']) / 60:.1f} minutes")
+    return True
+
+
+def stop():
+    state = read_daemon_state()
+    if not state:
+        print("Browser daemon is not running")
+        return
+    try:
+        os.kill(state["pid"], signal.SIGTERM)
+        print(f"Stopping browser daemon (pid {state['pid']})")
+    except ProcessLookupError:
+        DAEMON_STATE_PATH.unlink(missing_ok=True)
+        print("Browser daemon was not running; removed its stale state file")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a signed-in browser running for runs to attach to")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    start_parser = subparsers.add_parser("start", help="Start the daemon")
+    start_parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    start_parser.add_argument("--idle-minutes", type=float, default=DAEMON_IDLE_MINUTES)
+    start_parser.add_argument("--detach", action="store_true", help="Run in the background")
+    subparsers.add_parser("status", help="Show whether the daemon is running and healthy")
+    subparsers.add_parser("stop", help="Stop the daemon")
+    args = parser.parse_args()
+
+    if args.command == "start":
+        if args.detach:
+            process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "start", "--port", str(args.port),
+                                        "--idle-minutes", str(args.idle_minutes)], start_new_session=True,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            print(f"Browser daemon starting in the background (pid {process.pid})")
+        else:
+            serve(args.port, args.idle_minutes)
+    elif args.command == "status":
+        sys.exit(0 if status() else 1)
+    else:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
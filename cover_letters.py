@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+
+def hash_text(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode('utf-8'))
+        # Separator so ("ab", "c") and ("a", "bc") hash differently
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def markdown_to_text(markdown_content):
+    # Plain text for textareas: drop headings, emphasis and link syntax, keep line structure
+    text = re.sub(r'^\s{0,3}#{1,6}\s*', '', markdown_content, flags=re.MULTILINE)
+    text = re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', text)
+    text = re.sub(r'(\*\*|__)(.*?)\1', r'\2', text)
+    text = re.sub(r'(?<![\w*])\*(?!\s)(.*?)(?<!\s)\*(?![\w*])', r'\1', text)
+    text = re.sub(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+class CoverLetter:
+    # One generated letter. The markdown is always there; the plain text and the
+    # PDF are only produced the first time a form step asks for them.
+    def __init__(self, markdown_content, pdf_path, render=None):
+        self.markdown = markdown_content
+        self.pdf_path = Path(pdf_path)
+        self.render = render
+        self._text = None
+        self._lock = threading.Lock()
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = markdown_to_text(self.markdown)
+        return self._text
+
+    def ensure_pdf(self):
+        # Returns the rendered PDF's path, or None if rendering failed
+        with self._lock:
+            if not self.pdf_path.exists():
+                if self.render is None or not self.render(self.markdown, self.pdf_path):
+                    return None
+            return self.pdf_path
+
+    @property
+    def pdf_bytes(self):
+        pdf_path = self.ensure_pdf()
+        return pdf_path.read_bytes() if pdf_path else None
+
+
+class CoverLetterCache:
+    # Finished cover letters stored on disk, keyed by a hash of (job id, job description, CV) and the
+    # generation settings. Letters are also indexed by (job description, CV, settings) alone so
+    # reposted jobs with a new id reuse the same letter. Generation for a key happens at most once,
+    # even with concurrent callers. The markdown is stored as <key>.md and the PDF, once rendered,
+    # next to it as <key>.pdf. Hits only touch the in-memory index; it is written on put and flush().
+    def __init__(self, cache_dir="cover_cache", max_entries=200, max_bytes=50 * 1024 * 1024, render=None, settings=""):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / "index.json"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.render = render
+        # Anything besides the job and the CV that changes the letter (backend, model, CV excerpt size)
+        self.settings = settings
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._letters = {}
+        self._dirty = False
+        self.index = self._load_index()
+
+    def make_key(self, job_id, job_description, cv_text):
+        return hash_text(job_id, job_description, cv_text, self.settings)
+
+    def make_content_key(self, job_description, cv_text):
+        return hash_text(job_description, cv_text, self.settings)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        # Drop entries whose file was removed behind our back
+        return {key: entry for key, entry in index.items()
+                if entry["file"].endswith(".md") and (self.cache_dir / entry["file"]).exists()}
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def _letter(self, file_name):
+        # One CoverLetter object per file, so a PDF rendered once is shared by every caller
+        letter = self._letters.get(file_name)
+        if letter is None:
+            markdown_path = self.cache_dir / file_name
+            letter = CoverLetter(markdown_path.read_text(encoding='utf-8'), markdown_path.with_suffix(".pdf"), self.render)
+            self._letters[file_name] = letter
+        return letter
+
+    def get(self, key, content_key=None):
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None and content_key:
+                entry = next((e for e in self.index.values() if e.get("content_key") == content_key), None)
+                if entry is not None:
+                    # Reposted job, alias the existing letter under the new key
+                    entry = dict(entry)
+                    self.index[key] = entry
+            if entry is None:
+                return None
+            if not (self.cache_dir / entry["file"]).exists():
+                self.index.pop(key, None)
+                self._dirty = True
+                return None
+            entry["last_used"] = time.time()
+            self._dirty = True
+            return self._letter(entry["file"])
+
+    def put(self, key, markdown_content, job_id=None, content_key=None):
+        file_name = f"{key}.md"
+        markdown_path = self.cache_dir / file_name
+        markdown_path.write_text(markdown_content, encoding='utf-8')
+        # A PDF left over from an older version of this letter would no longer match
+        if markdown_path.with_suffix(".pdf").exists():
+            markdown_path.with_suffix(".pdf").unlink()
+        with self._lock:
+            self._letters.pop(file_name, None)
+            self.index[key] = {
+                "file": file_name,
+                "job_id": job_id,
+                "content_key": content_key,
+                "last_used": time.time()
+            }
+            self._evict()
+            self._save_index()
+            return self._letter(file_name)
+
+    def get_or_create(self, key, generate, job_id=None, content_key=None):
+        # generate() must return the new letter's markdown, or None on failure
+        with self._key_lock(key):
+            letter = self.get(key, content_key)
+            if letter is not None:
+                self.hits += 1
+                return letter
+            self.misses += 1
+            markdown_content = generate()
+            if not markdown_content:
+                return None
+            return self.put(key, markdown_content, job_id, content_key)
+
+    def _file_bytes(self, file_name):
+        total = 0
+        for path in (self.cache_dir / file_name, (self.cache_dir / file_name).with_suffix(".pdf")):
+            if path.exists():
+                total += path.stat().st_size
+        return total
+
+    def _evict(self):
+        # Least recently used first, until both the entry and byte limits hold.
+        # Aliased keys share a file, so a file is only removed once nothing points at it.
+        ordered = sorted(self.index.items(), key=lambda item: item[1]["last_used"])
+        files = {}
+        for _, entry in ordered:
+            files[entry["file"]] = self._file_bytes(entry["file"])
+        total_bytes = sum(files.values())
+        while ordered and (len(files) > self.max_entries or total_bytes > self.max_bytes):
+            key, entry = ordered.pop(0)
+            self.index.pop(key, None)
+            if any(e["file"] == entry["file"] for e in self.index.values()):
+                continue
+            total_bytes -= files.pop(entry["file"], 0)
+            self._letters.pop(entry["file"], None)
+            markdown_path = self.cache_dir / entry["file"]
+            for path in (markdown_path, markdown_path.with_suffix(".pdf")):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            files = {e["file"] for e in self.index.values()}
+            return {
+                "entries": len(self.index),
+                "bytes": sum(self._file_bytes(file_name) for file_name in files),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
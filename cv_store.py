@@ -0,0 +1,227 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CVStore:
+    # Parses the CV once and remembers the text, in memory and in a small JSON file.
+    # The cache is checked against the file's size/mtime first and its hash second,
+    # so touching the file without changing it does not trigger a re-parse.
+    def __init__(self, cv_path, cache_path, extract):
+        self.cv_path = Path(cv_path)
+        self.cache_path = Path(cache_path)
+        self.extract = extract
+        self._lock = threading.Lock()
+        self._entry = None
+        self._index = None
+        self.parses = 0
+
+    def _stat_key(self):
+        stat = self.cv_path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save(self, entry):
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def text(self):
+        with self._lock:
+            if not self.cv_path.exists():
+                print(f"Error: The file '{self.cv_path}' does not exist.")
+                return None
+            stat_key = self._stat_key()
+
+            if self._entry is None:
+                self._entry = self._load()
+            entry = self._entry
+            if entry and entry.get("path") == str(self.cv_path) and entry.get("stat") == stat_key:
+                return entry["text"]
+
+            sha256 = file_sha256(self.cv_path)
+            if entry and entry.get("sha256") == sha256:
+                entry.update({"path": str(self.cv_path), "stat": stat_key})
+                self._save(entry)
+                return entry["text"]
+
+            text = self.extract(self.cv_path)
+            self.parses += 1
+            if text is None:
+                return None
+            self._entry = {"path": str(self.cv_path), "stat": stat_key, "sha256": sha256, "text": text}
+            self._save(self._entry)
+            print(f"Parsed CV {self.cv_path} ({len(text)} characters)")
+            return text
+
+    def index(self):
+        text = self.text()
+        if text is None:
+            return None
+        with self._lock:
+            sha256 = self._entry["sha256"]
+            if self._index is None or self._index[0] != sha256:
+                self._index = (sha256, CVSectionIndex(text))
+            return self._index[1]
+
+    def relevant_sections(self, job_description, token_budget=800, top_k=12):
+        # Returns the CV chunks most relevant to the job as (section, text, score), in CV order
+        index = self.index()
+        return index.select(job_description, token_budget, top_k) if index else None
+
+    def relevance(self, job_description, top_k=5):
+        # How well the CV matches the job overall, for ranking jobs against each other
+        index = self.index()
+        return index.relevance(job_description, top_k) if index else 0.0
+
+
+SECTION_NAMES = {
+    "profile", "summary", "personal statement", "about me", "objective", "education", "experience",
+    "work experience", "employment", "employment history", "professional experience", "projects",
+    "personal projects", "skills", "technical skills", "key skills", "certifications", "certificates",
+    "achievements", "awards", "publications", "interests", "hobbies", "languages", "volunteering",
+    "leadership", "references", "courses", "training",
+}
+BULLET_CHARS = "•●▪‣◦-*–·"
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "our", "that", "the", "their", "this", "to", "we", "will", "with", "you",
+    "your", "who", "within", "work", "working", "role", "team", "job", "can", "all", "also", "other",
+}
+
+
+def tokenize(text):
+    return [token for token in re.findall(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]", text.lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def split_cv_sections(cv_text, max_chunk_chars=600):
+    # Splits CV text into (section, text) chunks: one per bullet, or per paragraph-sized run of lines.
+    # Everything before the first recognised heading is the header (name, contact details).
+    chunks = []
+    section = "Header"
+    current = []
+
+    def flush():
+        if current:
+            chunks.append((section, " ".join(current)))
+            current.clear()
+
+    for raw_line in cv_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            flush()
+            continue
+        bare = line.rstrip(":").strip()
+        # Short all-caps lines are headings too, except the very first line, which is usually the name
+        is_heading = bare.lower() in SECTION_NAMES or (
+            (chunks or current) and len(bare.split()) <= 4 and bare.isupper() and any(c.isalpha() for c in bare)
+        )
+        if is_heading:
+            flush()
+            section = bare.title()
+            continue
+        if line[0] in BULLET_CHARS:
+            flush()
+            line = line.lstrip(BULLET_CHARS).strip()
+        elif current and sum(len(part) for part in current) + len(line) > max_chunk_chars:
+            flush()
+        current.append(line)
+    flush()
+    return chunks
+
+
+class CVSectionIndex:
+    # BM25 index over the CV's chunks. Document weights are precomputed into one matrix,
+    # so scoring a job description is a single matrix-vector product.
+    def __init__(self, cv_text, k1=1.5, b=0.75):
+        import numpy as np
+        self.np = np
+        self.chunks = split_cv_sections(cv_text)
+        tokenized = [tokenize(f"{section} {text}") for section, text in self.chunks]
+        self.vocabulary = {}
+        for tokens in tokenized:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        tf = np.zeros((len(self.chunks), len(self.vocabulary)), dtype=np.float32)
+        for row, tokens in enumerate(tokenized):
+            for token in tokens:
+                tf[row, self.vocabulary[token]] += 1
+
+        lengths = tf.sum(axis=1, keepdims=True)
+        avg_length = lengths.mean() if len(self.chunks) else 1.0
+        document_frequency = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (len(self.chunks) - document_frequency + 0.5) / (document_frequency + 0.5))
+        self.weights = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / max(avg_length, 1.0)))
+
+    def score(self, query):
+        query_vector = self.np.zeros(len(self.vocabulary), dtype=self.np.float32)
+        for token in tokenize(query):
+            index = self.vocabulary.get(token)
+            if index is not None:
+                query_vector[index] = 1.0
+        return self.weights @ query_vector
+
+    def relevance(self, query, top_k):
+        if not self.chunks:
+            return 0.0
+        return float(self.np.sort(self.score(query))[-top_k:].sum())
+
+    def select(self, query, token_budget, top_k):
+        # The header (name and contact details) goes in first when it fits; the rest are taken best-first
+        # until the budget or top_k is hit, then put back in CV order so the prompt still reads like a CV.
+        # Returns [] when no chunk matches the job or none fits, so the caller sends the whole CV instead.
+        if not self.chunks:
+            return []
+        scores = self.score(query)
+        header = [0] if self.chunks[0][0] == "Header" else []
+        ranked = [int(i) for i in self.np.argsort(-scores, kind="stable") if int(i) not in header and scores[i] > 0]
+        selected = []
+        used = 0
+        for i in header + ranked[:top_k]:
+            cost = estimate_tokens(self.chunks[i][1])
+            if used + cost > token_budget:
+                continue
+            selected.append(i)
+            used += cost
+        if not any(i not in header for i in selected):
+            return []
+        selected.sort()
+        return [(self.chunks[i][0], self.chunks[i][1], float(scores[i])) for i in selected]
+
+
+def format_sections(selected):
+    lines = []
+    section = None
+    for name, text, _ in selected:
+        if name == "Header":
+            lines.append(text)
+            continue
+        if name != section:
+            lines.append(f"\n{name.upper()}")
+            section = name
+        lines.append(f"- {text}")
+    return "\n".join(lines).strip()
@@ -0,0 +1,256 @@
+import random
+
+# Easy Apply form steps are read with one page evaluation and filled from a plan, instead of
+# a dozen helpers that each probe the page for a field that is usually not there.
+
+# Every field of the current step with what is needed to decide what to do with it
+FORM_SNAPSHOT_JS = """
+() => {
+    const root = document.querySelector('div.jobs-easy-apply-content') || document;
+    const clean = (text) => (text || '').replace(/\\s+/g, ' ').trim();
+    const labelOf = (el) => {
+        const label = (el.labels && el.labels[0]) || (el.id && root.querySelector(`label[for="${CSS.escape(el.id)}"]`));
+        return clean(label ? label.textContent : el.getAttribute('aria-label'));
+    };
+    const fields = [];
+    for (const el of root.querySelectorAll('input:not([type="hidden"]):not([type="submit"]), select, textarea')) {
+        const fieldset = el.closest('fieldset');
+        const legend = fieldset && fieldset.querySelector('legend');
+        fields.push({
+            id: el.id,
+            name: el.name || '',
+            tag: el.tagName.toLowerCase(),
+            type: el.tagName === 'INPUT' ? (el.type || 'text') : el.tagName.toLowerCase(),
+            label: labelOf(el),
+            group: clean(legend ? legend.textContent : ''),
+            value: el.type === 'file' ? '' : (el.value || ''),
+            checked: !!el.checked,
+            required: el.required || el.getAttribute('aria-required') === 'true',
+            options: el.tagName === 'SELECT'
+                ? Array.from(el.options).map((option) => ({value: option.value, text: clean(option.text)}))
+                : []
+        });
+    }
+    const progress = document.querySelector('progress.artdeco-completeness-meter-linear__progress-element');
+    return {
+        sections: Array.from(root.querySelectorAll('span.jobs-easy-apply-form-section__label')).map((el) => clean(el.textContent)),
+        progress: progress ? parseInt(progress.getAttribute('value'), 10) || 0 : null,
+        fields: fields
+    };
+}
+"""
+
+def matching_option(field, value):
+    # The option whose value or text contains the wanted value, ignoring case
+    value = str(value).lower()
+    for option in field["options"]:
+        if option["value"] and (value == option["value"].lower() or value in option["text"].lower()):
+            return option["value"]
+    return None
+
+
+def classify_field(field, user_data):
+    # The action for one field as (kind, value, name), or None when the field is not one we know
+    field_id = field["id"]
+    label = field["label"].lower()
+    group = field["group"].lower()
+
+    if field["type"] == "file":
+        if field_id.startswith("jobs-document-upload-file-input-upload-cover-letter"):
+            return ("cover_letter", None, "cover letter")
+        return None
+    if field["tag"] == "select":
+        if field_id.endswith("-phoneNumber-country"):
+            value = matching_option(field, user_data['phone_country_code'])
+            return ("select", value, "phone country code") if value else None
+        if field_id.startswith("text-entity-list-form-component-formElement-") and field_id.endswith("-multipleChoice"):
+            value = matching_option(field, user_data['email'])
+            return ("select", value, "email") if value else None
+        return None
+    if field_id.endswith("-phoneNumber-nationalNumber"):
+        return ("fill", user_data['phone_number'], "phone number")
+    if field_id.endswith("-city-HOME-CITY"):
+        return ("typeahead", user_data['city'], "city")
+    if field["type"] == "radio":
+        if "driving license" in group:
+            wanted = user_data.get('driving_license', 'Prefer not to say').lower()
+            return ("check", None, "driving license") if wanted in label else None
+        return None
+    if field["tag"] == "textarea":
+        return ("summary", None, "summary") if "summary" in label else None
+    if field_id.endswith("-numeric"):
+        if label.startswith("how many years"):
+            return ("fill", '2' if "python" in label else '0', label)
+        if "salary" in label:
+            return ("fill", str(user_data.get('salary', '25000')), "salary")
+        return None
+    if field_id.endswith("-text"):
+        if "address" in label:
+            return ("fill", user_data['address'], "address")
+        if "headline" in label:
+            return ("fill", "Cover letter", "headline")
+    return None
+
+
+def plan_form_step(snapshot, user_data):
+    # Fill actions for the fields actually on this step; fields that already hold the value are left alone
+    plan = []
+    for field in snapshot["fields"]:
+        if not field["id"]:
+            continue
+        action = classify_field(field, user_data)
+        if action is None:
+            continue
+        kind, value, name = action
+        if kind in ("fill", "select", "typeahead") and field["value"] == value:
+            continue
+        if kind == "check" and field["checked"]:
+            continue
+        plan.append({"kind": kind, "id": field["id"], "value": value, "name": name})
+    return plan
+
+
+def has_diversity_section(snapshot):
+    return any("Equal Opportunities" in section for section in snapshot["sections"])
+
+
+def field_selector(field_id, attribute="id"):
+    # LinkedIn ids contain characters a #id selector would need escaped
+    escaped = field_id.replace("\\", "\\\\").replace('"', '\\"')
+    return f'[{attribute}="{escaped}"]'
+
+
+# Questions answered from user_data when a step still will not move on: (question text, user_data key)
+DIVERSITY_DROPDOWNS = [
+    ("What Right to Work in the UK documents do you hold?", "right_to_work"),
+    ("Are you currently living in the UK?", "living_in_uk"),
+    ("What is your notice period/availability?", "notice_period"),
+    ("What category would you consider your experience-level to be for the role you're applying for?", "experience_level"),
+    ("Do you have SC clearance?", "sc_clearance"),
+    ("Do you have secuity clearance?", "sc_clearance"),
+    ("Would you be willing to ", "willing")
+]
+RADIO_ANSWERS = [
+    (("visa", "sponsorship"), "no"),
+    (("legally authorized",), "yes"),
+    (("commute", "relocate", "location", "commuting", "onsite", "remote", "hybrid"), "yes"),
+]
+DEFAULT_OPTION_PHRASES = ['select an option', 'choose', 'select', 'please select']
+
+# Sets values and clicks in one evaluation; events are dispatched so the form's own handlers see the change.
+# Returns the ids that could not be found.
+APPLY_FIELD_VALUES_JS = """
+(actions) => {
+    const missing = [];
+    for (const action of actions) {
+        const el = document.getElementById(action.id);
+        if (!el) {
+            missing.push(action.id);
+            continue;
+        }
+        if (action.kind === 'click') {
+            el.click();
+            continue;
+        }
+        const setter = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set;
+        setter.call(el, action.value);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+    return missing;
+}
+"""
+
+
+def is_default_option_text(text):
+    text = text.lower().strip()
+    return text == '' or any(phrase in text for phrase in DEFAULT_OPTION_PHRASES)
+
+
+def plan_unknown_fields(snapshot, user_data, rng=random, answers=None):
+    # Answers for every field the known-field plan left alone, worked out from the step's snapshot:
+    # listed questions from user_data, empty text as "N/A" (or 0 when numeric), radio groups by their
+    # question, the rest at random, the same rules fill_unfilled_fields applies one field at a time.
+    # With an AnswerBook, an answer remembered from a submitted form is used before any guess. Each
+    # action carries its question, answer kind and answer, for AnswerBook.remember, and `learn`, which
+    # is False for random guesses and "N/A"/0 placeholders so they are never remembered.
+    actions = []
+    radio_groups = {}
+
+    def remembered(question, kind, choices=None):
+        return answers.lookup(question, kind, choices) if answers and question else None
+
+    def add(kind, field_id, value, question, answer_kind, answer, learn=True):
+        actions.append({"kind": kind, "id": field_id, "value": value, "name": question or field_id,
+                        "question": question, "answer_kind": answer_kind, "answer": answer, "learn": learn})
+
+    for field in snapshot["fields"]:
+        field_id = field["id"]
+        if not field_id:
+            continue
+        field_type = field["type"]
+        question = field["label"]
+        label = question.lower()
+
+        if field_type == "radio":
+            radio_groups.setdefault(field["name"] or field_id, []).append(field)
+        elif field["tag"] == "select":
+            if field["value"] and not is_default_option_text(field["value"]):
+                continue
+            valid = [option for option in field["options"] if option["value"] and not is_default_option_text(option["text"])]
+            option = None
+            for listed, key in DIVERSITY_DROPDOWNS:
+                if listed.lower() in label and user_data.get(key):
+                    option = next((option for option in valid if user_data[key].lower() in option["text"].lower()), None)
+                    break
+            if option is None:
+                text = remembered(question, "select", [option["text"] for option in valid])
+                option = next((option for option in valid if option["text"] == text), None)
+            guessed = option is None
+            if guessed and valid:
+                option = rng.choice(valid)
+            if option is not None:
+                add("value", field_id, option["value"], question, "select", option["text"], learn=not guessed)
+        elif field_type == "checkbox":
+            if "visa" in label or "sponsorship" in label:
+                if field["checked"]:
+                    add("click", field_id, False, question, "checkbox", "unchecked")
+                continue
+            if field["checked"]:
+                continue
+            answer = remembered(question, "checkbox", ["checked", "unchecked"])
+            guessed = answer is None
+            if guessed:
+                answer = "checked" if rng.choice([True, False]) else "unchecked"
+            if answer == "checked":
+                add("click", field_id, True, question, "checkbox", answer, learn=not guessed)
+        elif field_type in ("text", "textarea"):
+            if not field["value"].strip():
+                answer = remembered(question, field_type)
+                guessed = answer is None
+                if guessed:
+                    is_numeric = 'numeric' in field_id.lower() or 'number' in field_id.lower()
+                    answer = '0' if is_numeric else 'N/A'
+                add("value", field_id, answer, question, field_type, answer, learn=not guessed)
+
+    for name, radios in radio_groups.items():
+        question = radios[0]["group"]
+        guessed = False
+        target = next((answer for keywords, answer in RADIO_ANSWERS if any(keyword in question.lower() for keyword in keywords)), None)
+        if target:
+            radio = next((radio for radio in radios if radio["label"].strip().lower() == target), None)
+            if radio is None:
+                print(f"Could not find '{target.capitalize()}' option for radio group {name}")
+                continue
+            if radio["checked"]:
+                continue
+        elif any(radio["checked"] for radio in radios):
+            continue
+        else:
+            answer = remembered(question, "radio", [radio["label"] for radio in radios])
+            radio = next((radio for radio in radios if radio["label"] == answer), None)
+            guessed = radio is None
+            if guessed:
+                radio = rng.choice(radios)
+        add("click", radio["id"], True, question, "radio", radio["label"], learn=not guessed)
+    return actions
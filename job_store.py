@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+
+JOB_STATES = ("applied", "failed", "skipped", "seen", "queued")
+# Jobs in these states are never opened again; "seen" jobs were looked at but not decided,
+# "queued" jobs passed filtering and are waiting for the apply stage
+HANDLED_STATES = ("applied", "failed", "skipped")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    reason TEXT,
+    title TEXT,
+    company TEXT,
+    location TEXT,
+    link TEXT,
+    description TEXT,
+    score REAL,
+    easy_apply INTEGER,
+    first_seen REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, updated);
+
+CREATE TABLE IF NOT EXISTS applications (
+    application_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    seconds REAL,
+    outcome TEXT
+);
+CREATE INDEX IF NOT EXISTS applications_job ON applications (job_id);
+CREATE INDEX IF NOT EXISTS applications_outcome ON applications (outcome, started);
+
+CREATE TABLE IF NOT EXISTS attempts (
+    attempt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    detail TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_application ON attempts (application_id, step);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    artifact_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    application_id TEXT,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_job ON artifacts (job_id, kind);
+
+CREATE TABLE IF NOT EXISTS answers (
+    question TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    label TEXT,
+    uses INTEGER NOT NULL DEFAULT 1,
+    confirmed REAL NOT NULL,
+    PRIMARY KEY (question, kind)
+);
+
+CREATE TABLE IF NOT EXISTS searches (
+    search_key TEXT PRIMARY KEY,
+    pages INTEGER NOT NULL,
+    cards INTEGER NOT NULL,
+    fresh INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+# A job that was applied to stays applied; details only overwrite what is already known when given
+UPSERT_JOB = """
+INSERT INTO jobs (job_id, state, reason, title, company, location, link, description, score, easy_apply, first_seen, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (job_id) DO UPDATE SET
+    state = CASE WHEN jobs.state = 'applied' THEN 'applied' ELSE excluded.state END,
+    reason = CASE WHEN jobs.state = 'applied' THEN jobs.reason ELSE excluded.reason END,
+    title = COALESCE(excluded.title, jobs.title),
+    company = COALESCE(excluded.company, jobs.company),
+    location = COALESCE(excluded.location, jobs.location),
+    link = COALESCE(excluded.link, jobs.link),
+    description = COALESCE(excluded.description, jobs.description),
+    score = COALESCE(excluded.score, jobs.score),
+    easy_apply = COALESCE(excluded.easy_apply, jobs.easy_apply),
+    updated = excluded.updated
+"""
+
+
+class JobStore:
+    # Jobs, applications, form step attempts and generated files in one SQLite database.
+    # Writes are queued and committed together, once batch_size writes are waiting or
+    # flush_interval seconds have passed, or when flush() is called. WAL mode and a busy
+    # timeout let several processes share the file; each one keeps an in-memory index of
+    # job states that is refreshed from the database with an indexed query.
+    def __init__(self, path="jobs.db", batch_size=25, flush_interval=2.0, legacy_paths=()):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.run_id = uuid.uuid4().hex
+        self._lock = threading.RLock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._synced_at = 0.0
+        self.states = {}
+        self.commits = 0
+        self.writes = 0
+
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+        # Databases created before jobs had a score or an Easy Apply flag
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+        if "score" not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN score REAL")
+        if "easy_apply" not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN easy_apply INTEGER")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (state, score)")
+        self.migrate_json(legacy_paths)
+        self.refresh()
+
+    def migrate_json(self, legacy_paths):
+        # One-off import of failed_applications.json (a list of ids) or job_state.json
+        # ({id: {"state": ...}}); the file is renamed afterwards so it is only read once
+        for legacy_path in legacy_paths:
+            legacy_path = Path(legacy_path)
+            if not legacy_path.exists():
+                continue
+            try:
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Could not migrate {legacy_path}: not valid JSON")
+                continue
+            if isinstance(data, dict):
+                entries = [(str(job_id), entry.get("state"), entry.get("reason"), entry.get("title"), entry.get("company"))
+                           for job_id, entry in data.items()]
+            else:
+                entries = [(str(job_id), "failed", "imported", None, None) for job_id in data]
+            now = time.time()
+            with self._lock:
+                for job_id, state, reason, title, company in entries:
+                    if state in JOB_STATES:
+                        self._queue(UPSERT_JOB, (job_id, state, reason, title, company, None, None, None, None, None, now, now))
+                self.flush()
+            os.replace(legacy_path, legacy_path.with_suffix(legacy_path.suffix + ".migrated"))
+            print(f"Migrated {len(entries)} jobs from {legacy_path} into {self.path}")
+
+    def _queue(self, sql, params):
+        self._pending.append((sql, params))
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending = self._pending
+            self._pending = []
+            # IMMEDIATE takes the write lock up front, so two processes never deadlock upgrading a read
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in pending:
+                    self.conn.execute(sql, params)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                self._pending = pending + self._pending
+                raise
+            self._last_flush = time.monotonic()
+            self.commits += 1
+            self.writes += len(pending)
+
+    def refresh(self):
+        # Picks up states written since the last refresh, including by other processes
+        with self._lock:
+            self.flush()
+            synced_at = time.time()
+            rows = self.conn.execute(
+                "SELECT job_id, state FROM jobs WHERE updated >= ?", (self._synced_at - 1,)
+            ).fetchall()
+            for job_id, state in rows:
+                self.states[job_id] = state
+            self._synced_at = synced_at
+
+    def state(self, job_id):
+        return self.states.get(job_id)
+
+    def is_handled(self, job_id):
+        return self.states.get(job_id) in HANDLED_STATES
+
+    def handled_ids(self):
+        self.refresh()
+        with self._lock:
+            return [job_id for job_id, state in self.states.items() if state in HANDLED_STATES]
+
+    def mark(self, job_id, state, reason=None, save=False, title=None, company=None, location=None, link=None, description=None, score=None,
+             easy_apply=None):
+        if state not in JOB_STATES:
+            raise ValueError(f"Unknown job state: {state}")
+        now = time.time()
+        with self._lock:
+            if self.states.get(job_id) != "applied":
+                self.states[job_id] = state
+            self._queue(UPSERT_JOB, (job_id, state, reason, title, company, location, link, description, score,
+                                     None if easy_apply is None else int(easy_apply), now, now))
+            if save:
+                self.flush()
+
+    def stored_jobs(self, state="queued", limit=None):
+        # Jobs in one state as job data dicts, best ranked first; "queued" jobs are waiting for the apply stage.
+        # easy_apply is None for jobs stored before the flag was, the apply stage finds out from the job page.
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute(
+                "SELECT job_id, title, company, location, link, description, score, easy_apply FROM jobs "
+                "WHERE state = ? ORDER BY score DESC, updated LIMIT ?",
+                (state, limit if limit is not None else -1)
+            ).fetchall()
+        return [{
+            "job_id": job_id, "job_title": title or "", "company": company or "", "location": location or "",
+            "link": link or "", "easy_apply": None if easy_apply is None else bool(easy_apply),
+            "job_description": description or "", "score": score or 0.0
+        } for job_id, title, company, location, link, description, score, easy_apply in rows]
+
+    def start_application(self, job_id):
+        application_id = uuid.uuid4().hex
+        with self._lock:
+            self._queue(
+                "INSERT INTO applications (application_id, job_id, run_id, started) VALUES (?, ?, ?, ?)",
+                (application_id, job_id, self.run_id, time.time())
+            )
+        return application_id
+
+    def finish_application(self, application_id, outcome):
+        now = time.time()
+        with self._lock:
+            self._queue(
+                "UPDATE applications SET finished = ?, seconds = ? - started, outcome = ? WHERE application_id = ?",
+                (now, now, outcome, application_id)
+            )
+            self.flush()
+
+    def record_attempt(self, application_id, step, seconds, outcome, detail=None):
+        with self._lock:
+            self._queue(
+                "INSERT INTO attempts (application_id, step, seconds, outcome, detail, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (application_id, step, seconds, outcome, detail, time.time())
+            )
+
+    def add_artifact(self, job_id, kind, path, application_id=None):
+        with self._lock:
+            self._queue(
+                "INSERT INTO artifacts (job_id, application_id, kind, path, created) VALUES (?, ?, ?, ?, ?)",
+                (job_id, application_id, kind, str(path), time.time())
+            )
+
+    def save_answer(self, question, kind, answer, label):
+        # Answers that went through a submitted application; a newer answer to the same question replaces the old one
+        now = time.time()
+        with self._lock:
+            self._queue(
+                "INSERT INTO answers (question, kind, answer, label, uses, confirmed) VALUES (?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (question, kind) DO UPDATE SET answer = excluded.answer, label = excluded.label, "
+                "uses = CASE WHEN answers.answer = excluded.answer THEN answers.uses + 1 ELSE 1 END, confirmed = excluded.confirmed",
+                (question, kind, answer, label, now)
+            )
+
+    def stored_answers(self):
+        with self._lock:
+            self.flush()
+            return self.conn.execute("SELECT question, kind, answer, label, uses FROM answers").fetchall()
+
+    def save_search(self, search_key, pages, cards, fresh):
+        # The latest run of a search: pages read, cards listed and how many of them were new jobs
+        with self._lock:
+            self._queue(
+                "INSERT INTO searches (search_key, pages, cards, fresh, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (search_key) DO UPDATE SET pages = excluded.pages, cards = excluded.cards, "
+                "fresh = excluded.fresh, updated = excluded.updated",
+                (search_key, pages, cards, fresh, time.time())
+            )
+
+    def stored_searches(self):
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute("SELECT search_key, cards, fresh FROM searches").fetchall()
+        return {search_key: (cards, fresh) for search_key, cards, fresh in rows}
+
+    def counts(self):
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {state: 0 for state in JOB_STATES}
+        counts.update(dict(rows))
+        return counts
+
+    def run_report(self):
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute(
+                "SELECT outcome, COUNT(*), AVG(seconds) FROM applications WHERE run_id = ? GROUP BY outcome",
+                (self.run_id,)
+            ).fetchall()
+        return {outcome or "unfinished": {"count": count, "avg_seconds": round(avg or 0.0, 2)} for outcome, count, avg in rows}
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
@@ -0,0 +1,286 @@
+import re
+import time
+from abc import ABC, abstractmethod
+import asyncio
+import threading
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+  body {{ font-family: Arial, Calibri, "Times New Roman", sans-serif; font-size: 11pt; line-height: 1.4; color: #000; }}
+  h1 {{ font-size: 18pt; margin: 0 0 8pt 0; }}
+  h2 {{ font-size: 13pt; margin: 12pt 0 6pt 0; }}
+  p {{ margin: 0 0 9pt 0; }}
+</style>
+</head>
+<body>{body}</body>
+</html>"""
+
+
+def markdown_to_html(markdown_content):
+    import markdown
+    return HTML_TEMPLATE.format(body=markdown.markdown(markdown_content))
+
+
+class PdfRenderer(ABC):
+    # Common interface: render(markdown_content, output_path) -> bool, safe to call from any thread.
+    # Subclasses implement _render, which raises on failure
+    name = "base"
+
+    def __init__(self):
+        self.renders = 0
+        self.failures = 0
+        self.render_time = 0.0
+        self._stats_lock = threading.Lock()
+
+    def render(self, markdown_content, output_path):
+        started = time.monotonic()
+        try:
+            self._render(markdown_content, str(output_path))
+            ok = True
+        except Exception as e:
+            print(f"Error in creating PDF with {self.name}: {str(e)}")
+            ok = False
+        with self._stats_lock:
+            self.renders += 1
+            self.failures += 0 if ok else 1
+            self.render_time += time.monotonic() - started
+        return ok
+
+    @abstractmethod
+    def _render(self, markdown_content, output_path):
+        pass
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "renderer": self.name,
+                "renders": self.renders,
+                "failures": self.failures,
+                "avg_seconds": self.render_time / self.renders if self.renders else 0.0
+            }
+
+    def close(self):
+        pass
+
+
+class WkhtmltopdfRenderer(PdfRenderer):
+    # The original pdfkit path, one wkhtmltopdf process per letter
+    name = "wkhtmltopdf"
+
+    def _render(self, markdown_content, output_path):
+        import pdfkit
+        # Use UTF-8 encoding for pdfkit
+        pdfkit.from_string(markdown_to_html(markdown_content), output_path, options={'encoding': "UTF-8"})
+
+
+class ChromiumRenderer(PdfRenderer):
+    # Keeps a headless Chromium with a few warm pages alive on a background event loop.
+    # page.pdf() only works headless, so this is a separate browser from the (headed) one
+    # used for LinkedIn, but it comes from the same Playwright install.
+    name = "chromium"
+
+    def __init__(self, pages=2, timeout=30):
+        super().__init__()
+        self.pages = pages
+        self.timeout = timeout
+        self.loop = None
+        self.thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=loop.run_forever, name="pdf-renderer", daemon=True)
+            self.thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._start(), loop).result(self.timeout)
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+            self.loop = loop
+
+    async def _start(self):
+        from playwright.async_api import async_playwright
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=True)
+        self.page_pool = asyncio.Queue()
+        for _ in range(self.pages):
+            await self.page_pool.put(await self.browser.new_page())
+
+    async def _render_page(self, html_content, output_path):
+        page = await self.page_pool.get()
+        try:
+            await page.set_content(html_content, wait_until="domcontentloaded")
+            await page.pdf(path=output_path, format="A4", margin={"top": "2cm", "bottom": "2cm", "left": "2cm", "right": "2cm"})
+        finally:
+            await self.page_pool.put(page)
+
+    def _render(self, markdown_content, output_path):
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._render_page(markdown_to_html(markdown_content), output_path), self.loop)
+        future.result(self.timeout)
+
+    async def _stop(self):
+        await self.browser.close()
+        await self.playwright.stop()
+
+    def close(self):
+        with self._start_lock:
+            if self.loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result(self.timeout)
+            except Exception as e:
+                print(f"Error closing PDF renderer: {str(e)}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(self.timeout)
+            self.loop = None
+
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126, from the standard AFM metrics
+HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+# Typographic characters the model likes to use, mapped onto what the base fonts can show
+PDF_TEXT_REPLACEMENTS = {
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-", "\u2022": "-", "\u2026": "...", "\u00a0": " ",
+}
+
+
+class TextPdfRenderer(PdfRenderer):
+    # Writes a plain PDF directly, no external process or browser. Headings are set in
+    # Helvetica-Bold and everything else in Helvetica; inline markdown emphasis is dropped.
+    name = "text"
+
+    PAGE_WIDTH = 595
+    PAGE_HEIGHT = 842
+    MARGIN = 64
+    STYLES = {
+        "h1": ("F2", 18, 1.1),
+        "h2": ("F2", 13, 1.05),
+        "p": ("F1", 11, 1.0),
+    }
+
+    def _render(self, markdown_content, output_path):
+        with open(output_path, 'wb') as f:
+            f.write(self.build_pdf(markdown_content))
+
+    @staticmethod
+    def _clean(text):
+        for original, replacement in PDF_TEXT_REPLACEMENTS.items():
+            text = text.replace(original, replacement)
+        text = re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', text)
+        text = re.sub(r'(\*\*|__|\*)(.*?)\1', r'\2', text)
+        return text.encode('latin-1', errors='replace').decode('latin-1')
+
+    @staticmethod
+    def _text_width(text, size, bold_factor):
+        units = sum(HELVETICA_WIDTHS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text)
+        return units * size * bold_factor / 1000
+
+    def _blocks(self, markdown_content):
+        # Paragraphs are runs of non-empty lines; headings and list items stand alone
+        blocks = []
+        paragraph = []
+        for line in markdown_content.splitlines():
+            stripped = line.strip()
+            heading = re.match(r'^(#{1,6})\s+(.*)$', stripped)
+            if not stripped or heading or re.match(r'^[-*+]\s+', stripped):
+                if paragraph:
+                    blocks.append(("p", " ".join(paragraph)))
+                    paragraph = []
+                if heading:
+                    blocks.append(("h1" if len(heading.group(1)) == 1 else "h2", heading.group(2)))
+                elif stripped:
+                    blocks.append(("p", "- " + re.sub(r'^[-*+]\s+', '', stripped)))
+            else:
+                paragraph.append(stripped)
+        if paragraph:
+            blocks.append(("p", " ".join(paragraph)))
+        return blocks
+
+    def _wrap(self, text, size, bold_factor):
+        max_width = self.PAGE_WIDTH - 2 * self.MARGIN
+        lines = []
+        current = ""
+        for word in text.split():
+            candidate = f"{current} {word}" if current else word
+            if current and self._text_width(candidate, size, bold_factor) > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        if current:
+            lines.append(current)
+        return lines
+
+    def build_pdf(self, markdown_content):
+        pages = [[]]
+        y = self.PAGE_HEIGHT - self.MARGIN
+        for style, text in self._blocks(markdown_content):
+            font, size, bold_factor = self.STYLES[style]
+            leading = size * 1.35
+            for line in self._wrap(self._clean(text), size, bold_factor):
+                if y - leading < self.MARGIN:
+                    pages.append([])
+                    y = self.PAGE_HEIGHT - self.MARGIN
+                y -= leading
+                escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+                pages[-1].append(f"BT /{font} {size} Tf {self.MARGIN} {y:.2f} Td ({escaped}) Tj ET")
+            y -= size * 0.6
+
+        # Objects: 1 catalog, 2 page tree, 3-4 fonts, then a page and a content stream per page
+        objects = [
+            "<< /Type /Catalog /Pages 2 0 R >>",
+            None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        page_ids = []
+        for commands in pages:
+            stream = "\n".join(commands).encode('latin-1')
+            page_ids.append(len(objects) + 1)
+            objects.append(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.PAGE_WIDTH} {self.PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {len(objects) + 2} 0 R >>"
+            )
+            objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+        output = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            body = body.encode('latin-1') if isinstance(body, str) else body
+            output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        xref_offset = len(output)
+        output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            output += b"%010d 00000 n \n" % offset
+        output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+        return bytes(output)
+
+
+RENDERERS = {
+    "chromium": ChromiumRenderer,
+    "text": TextPdfRenderer,
+    "wkhtmltopdf": WkhtmltopdfRenderer,
+}
+
+
+def get_renderer(name):
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown PDF renderer: {name}. Choose from {', '.join(RENDERERS)}")
+    return RENDERERS[name]()
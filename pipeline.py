@@ -0,0 +1,432 @@
+import time
+import asyncio
+import argparse
+import itertools
+
+STAGE_ORDER = ["scrape", "filter", "generate", "apply"]
+
+
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_latency = 0.0
+        self.blocked_seconds = 0.0
+        self.started = None
+        self.finished = None
+
+    def record(self, latency, produced, error=False):
+        self.items_in += 1
+        self.busy_seconds += latency
+        self.max_latency = max(self.max_latency, latency)
+        if error:
+            self.errors += 1
+        elif produced:
+            self.items_out += 1
+        else:
+            self.dropped += 1
+
+    def record_blocked(self, seconds):
+        self.blocked_seconds += seconds
+
+    def row(self):
+        elapsed = ((self.finished or time.monotonic()) - self.started) if self.started else 0.0
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "in": self.items_in,
+            "out": self.items_out,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "items_per_s": round(self.items_in / elapsed, 2) if elapsed else 0.0,
+            "avg_latency_s": round(self.busy_seconds / self.items_in, 2) if self.items_in else 0.0,
+            "max_latency_s": round(self.max_latency, 2),
+            # Share of the stage's worker time spent processing; the bottleneck is the stage closest to 1
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 2) if elapsed else 0.0,
+            "blocked_s": round(self.blocked_seconds, 2)
+        }
+
+
+class Stage:
+    # One step of the pipeline: `workers` tasks each take an item from this stage's bounded
+    # input queue, await process(worker, item) and put the result (unless it is None) on the
+    # next stage's queue, waiting while that queue is full. setup() is awaited once by each
+    # worker task and its result is that worker's first argument, so a stage can hold a
+    # resource such as a browser page. With `priority`, the highest scoring queued item goes first.
+    def __init__(self, name, process, workers=1, queue_size=8, setup=None, teardown=None, priority=None):
+        self.name = name
+        self.process = process
+        self.workers = workers
+        self.setup = setup
+        self.teardown = teardown
+        self.priority = priority
+        self.queue = asyncio.PriorityQueue(maxsize=queue_size) if priority else asyncio.Queue(maxsize=queue_size)
+        self.stats = StageStats(name, workers)
+        self.next = None
+        self.tasks = []
+        self._finished_workers = 0
+
+    async def put(self, item, sequence):
+        rank = -self.priority(item) if self.priority else 0
+        await self.queue.put((rank, sequence, item))
+
+    async def close(self):
+        # One end marker per worker, ranked after every real item
+        for _ in range(self.workers):
+            await self.queue.put((float("inf"), float("inf"), None))
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+        self.stopped = asyncio.Event()
+        self.source_stats = None
+        self.results = []
+        self._sequence = itertools.count()
+
+    def stop(self):
+        # Stops taking new items from the source; items already queued are drained and dropped
+        self.stopped.set()
+
+    async def _emit(self, stage_stats, next_stage, item):
+        if next_stage is None:
+            self.results.append(item)
+            return
+        started = time.monotonic()
+        await next_stage.put(item, next(self._sequence))
+        stage_stats.record_blocked(time.monotonic() - started)
+
+    async def _work(self, stage):
+        worker = None
+        try:
+            worker = await stage.setup() if stage.setup else None
+            while True:
+                _, _, item = await stage.queue.get()
+                if item is None:
+                    break
+                if self.stopped.is_set():
+                    stage.stats.record(0.0, False)
+                    continue
+                started = time.monotonic()
+                try:
+                    result = await stage.process(worker, item)
+                    error = False
+                except Exception as e:
+                    print(f"Stage {stage.name} failed on job ID {item.get('job_id')}: {str(e)}")
+                    result, error = None, True
+                stage.stats.record(time.monotonic() - started, result is not None, error)
+                if result is not None:
+                    await self._emit(stage.stats, stage.next, result)
+        except Exception as e:
+            print(f"Stage {stage.name} worker stopped: {str(e)}")
+            # Keep draining so upstream stages never wait on a queue nobody reads
+            while True:
+                _, _, item = await stage.queue.get()
+                if item is None:
+                    break
+                stage.stats.record(0.0, False, error=True)
+        finally:
+            if stage.teardown and worker is not None:
+                await stage.teardown(worker)
+            stage._finished_workers += 1
+            if stage._finished_workers == stage.workers:
+                stage.stats.finished = time.monotonic()
+                if stage.next:
+                    await stage.next.close()
+
+    async def run(self, source_name, source):
+        # The source is an async iterator consumed by this task, which is where the scraping page is used
+        self.source_stats = StageStats(source_name, 1)
+        self.source_stats.started = time.monotonic()
+        for stage in self.stages:
+            stage.stats.started = time.monotonic()
+            stage.tasks = [asyncio.create_task(self._work(stage)) for _ in range(stage.workers)]
+
+        first = self.stages[0] if self.stages else None
+        iterator = source.__aiter__()
+        while not self.stopped.is_set():
+            started = time.monotonic()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                print(f"Stage {source_name} stopped: {str(e)}")
+                break
+            self.source_stats.record(time.monotonic() - started, True)
+            await self._emit(self.source_stats, first, item)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+        self.source_stats.finished = time.monotonic()
+
+        if first:
+            await first.close()
+        await asyncio.gather(*(task for stage in self.stages for task in stage.tasks))
+        return self.results
+
+    def report(self):
+        return [self.source_stats.row()] + [stage.stats.row() for stage in self.stages]
+
+
+class ApplicationTarget:
+    # Counts submitted applications across the apply workers and stops new ones once the target is
+    # in reach; `slots` caps how many applications are in progress at once
+    def __init__(self, target, max_concurrent):
+        self.target = target
+        self.slots = asyncio.Semaphore(max(1, max_concurrent))
+        self.submitted = 0
+        self.in_progress = 0
+        self.changed = asyncio.Condition()
+
+    def done(self):
+        return self.submitted >= self.target
+
+    async def claim(self):
+        # Starts an application only if it could still be needed to reach the target, so the
+        # workers do not overshoot it; waits while the in-progress ones might still get there
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.done() or self.submitted + self.in_progress < self.target)
+            if self.done():
+                return False
+            self.in_progress += 1
+            return True
+
+    async def release(self, submitted):
+        async with self.changed:
+            self.in_progress -= 1
+            self.submitted += 1 if submitted else 0
+            self.changed.notify_all()
+
+
+# The job application stages, run on the asyncio engine in async_applier.py; `python sel.py` runs
+# all of them. The first stage of a run is its source: "scrape" walks the search results, "filter"
+# starts from jobs already scraped ("seen" in the job store), and "generate" or "apply" start from
+# the ranked queue ("queued" jobs) a previous filter run left behind.
+
+async def scrape_jobs(applier, location=None, distance=None, max_pages=None, scheduler=None):
+    # Walks one search page by page, or with a scheduler, the pages of several searches in its order
+    if scheduler is None:
+        await applier.open_search(location, distance)
+    # LinkedIn repeats promoted jobs across result pages; each one is only passed on once
+    scraped_ids = set()
+    page_number = 1
+    while True:
+        if scheduler:
+            search = await applier.open_scheduled_page(scheduler)
+            if search is None:
+                print("No more search pages available")
+                return
+        try:
+            cards = await applier.read_results_page()
+        except Exception as e:
+            print(f"Error on page {page_number}: {str(e)}")
+            cards = None
+        if cards is None:
+            if scheduler:
+                # A search whose page could not be read is not queued again
+                scheduler.finish(search)
+                page_number += 1
+                continue
+        else:
+            # Only trust a missing Easy Apply badge if the badge shows up somewhere on this page
+            badges_seen = any(card["easy_apply"] for card in cards)
+            page_cards = len(cards)
+            skipped = 0
+            if scheduler:
+                # Postings another search already turned up are dropped before anything else
+                cards = scheduler.take_page(search, cards)
+                skipped = page_cards - len(cards)
+                await applier.prefetch_page(scheduler.peek_url())
+            for card in cards:
+                # List-level rejections cost no clicks; everything else is opened for its description
+                skip_reason = await asyncio.to_thread(applier.card_skip_reason, card, badges_seen)
+                if not skip_reason and card["job_id"] in scraped_ids:
+                    skip_reason = "already queued"
+                if skip_reason:
+                    print(f"Skipping job ID {card['job_id']} ({card['title'] or 'Unknown Title'}): {skip_reason}")
+                    skipped += 1
+                    continue
+                scraped_ids.add(card["job_id"])
+                try:
+                    job = await applier.read_job_details(card)
+                except Exception as e:
+                    print(f"Error reading job ID {card['job_id']}: {str(e)}")
+                    continue
+                await asyncio.to_thread(applier.job_store.mark, job["job_id"], "seen", title=job["job_title"], company=job["company"],
+                                        location=job["location"], link=job["link"], description=job["job_description"],
+                                        easy_apply=job["easy_apply"])
+                yield job
+            await asyncio.to_thread(applier.record_page, page_number, page_cards, skipped)
+        if max_pages and page_number >= max_pages:
+            return
+        if scheduler:
+            page_number += 1
+            continue
+        if not await applier.go_to_next_page():
+            print("No more pages available")
+            return
+        page_number += 1
+        print(f"Moving to page {page_number}")
+
+
+async def stored_jobs(applier, state):
+    for job in await asyncio.to_thread(applier.job_store.stored_jobs, state):
+        yield job
+
+
+def rank_job(applier, job):
+    # Detail-level checks the card list could not make, then a CV relevance score for ranking.
+    # Reads the CV index and writes to the job store, so it runs on a thread.
+    title = job["job_title"].lower()
+    # None when the job was stored before the flag was; the apply stage checks the job page then
+    if job["easy_apply"] is False:
+        applier.job_store.mark(job["job_id"], "skipped", "no Easy Apply")
+        return None
+    if "intern" in title or "internship" in title:
+        applier.job_store.mark(job["job_id"], "skipped", "internship")
+        return None
+    job["score"] = applier.cv_store.relevance(job["job_title"] + " " + job["job_description"])
+    applier.job_store.mark(job["job_id"], "queued", score=job["score"], title=job["job_title"], description=job["job_description"])
+    return job
+
+
+async def filter_and_rank(applier, job):
+    return await asyncio.to_thread(rank_job, applier, job)
+
+
+async def generate_letter(applier, job):
+    # The letter task the apply stage awaits, so a letter still being written is not started twice
+    if applier.user_data["used_cover"] == False:
+        try:
+            letter = await applier.prefetch_cover_letter(job)
+        except Exception as e:
+            print(f"Cover letter failed for job ID {job['job_id']}: {str(e)}")
+            letter = None
+        if letter is None:
+            print(f"No cover letter generated for job ID {job['job_id']}, the apply stage will retry")
+            applier.letter_tasks.pop(job["job_id"], None)
+    return job
+
+
+def build_stages(applier, names, target, generate_workers=2, apply_workers=1, queue_size=8, on_target=None):
+    # generate_workers=0 keeps the stage but only passes jobs on, so letters are written when a form asks
+    from async_applier import AsyncApplyWorker
+    from sel import MAX_CONCURRENT_APPLICATIONS
+
+    applications = ApplicationTarget(target, min(MAX_CONCURRENT_APPLICATIONS, apply_workers))
+    worker_ids = itertools.count(1)
+
+    async def open_worker():
+        worker = AsyncApplyWorker(applier, next(worker_ids), await applier.new_page())
+        applier.apply_workers.append(worker)
+        return worker
+
+    async def apply(worker, job):
+        if not await applications.claim():
+            return None
+        submitted = False
+        try:
+            async with applications.slots:
+                submitted = await worker.apply(job)
+        finally:
+            await applications.release(submitted)
+        if applications.done() and on_target:
+            on_target()
+        return job if submitted else None
+
+    async def filter_job(_, job):
+        return await filter_and_rank(applier, job)
+
+    async def generate(_, job):
+        return await generate_letter(applier, job) if generate_workers > 0 else job
+
+    available = {
+        "filter": lambda: Stage("filter", filter_job, 1, queue_size),
+        "generate": lambda: Stage("generate", generate, max(1, generate_workers), queue_size,
+                                  priority=lambda job: job.get("score", 0.0)),
+        "apply": lambda: Stage("apply", apply, apply_workers, queue_size, setup=open_worker,
+                               teardown=lambda worker: worker.page.close(), priority=lambda job: job.get("score", 0.0)),
+    }
+    return [available[name]() for name in names if name in available]
+
+
+async def run_pipeline(names, job_title="graduate", location=None, distance=None, num_applications=5, max_pages=None,
+                       generate_workers=2, apply_workers=1, queue_size=8, searches=None):
+    from async_applier import AsyncLinkedInJobApplier
+    from search_scheduler import SearchScheduler
+    from sel import RESULTS_PAGE_SIZE
+
+    if names != STAGE_ORDER[STAGE_ORDER.index(names[0]):STAGE_ORDER.index(names[0]) + len(names)]:
+        raise ValueError(f"Stages must be consecutive, in the order {' -> '.join(STAGE_ORDER)}")
+
+    applier = AsyncLinkedInJobApplier()
+    try:
+        await applier.start()
+        if "scrape" in names or "apply" in names:
+            # Apply workers are pages in the same logged-in browser as the search page
+            await applier.ensure_login()
+            if not applier.logged_in:
+                print("Failed to log in. Cannot proceed with job applications.")
+                return None
+        scheduler = None
+        if names[0] == "scrape":
+            applier.job_title = job_title
+            scheduler = SearchScheduler(searches, applier.job_store, RESULTS_PAGE_SIZE) if searches else None
+            source = scrape_jobs(applier, location, distance, max_pages, scheduler)
+        elif names[0] == "filter":
+            source = stored_jobs(applier, "seen")
+        else:
+            source = stored_jobs(applier, "queued")
+        print(f"Running stages: {' -> '.join(names)}")
+
+        # Without scraping, the first stage is fed straight from the job store
+        stage_names = names[1:] if names[0] == "scrape" else names
+        source_name = "scrape" if names[0] == "scrape" else "job store"
+        pipeline = None
+        stages = build_stages(applier, stage_names, num_applications, generate_workers, apply_workers, queue_size,
+                              on_target=lambda: pipeline.stop())
+        pipeline = Pipeline(stages)
+        results = await pipeline.run(source_name, source)
+
+        report = pipeline.report()
+        for row in report:
+            print(row)
+        slowest = max(report, key=lambda row: row["utilization"])
+        print(f"Busiest stage: {slowest['stage']} (utilization {slowest['utilization']})")
+        if applier.apply_workers:
+            print(f"Apply workers: {[worker.report() for worker in applier.apply_workers]}")
+        await asyncio.to_thread(applier.print_run_report, len(results) if names[-1] == 'apply' else None)
+        print(f"Cover letter prefetch: {applier.letter_stats()}")
+        if scheduler:
+            print(f"Searches: {scheduler.stats()}")
+        return results
+    finally:
+        await applier.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the job application pipeline, or some of its stages")
+    parser.add_argument("--stages", nargs="+", choices=STAGE_ORDER, default=STAGE_ORDER,
+                        help="Consecutive stages to run, e.g. 'scrape filter' to only build the queue or 'apply' to work through it")
+    parser.add_argument("--title", default="graduate")
+    parser.add_argument("--location", default="Sheffield")
+    parser.add_argument("--distance", default="4")
+    parser.add_argument("--applications", type=int, default=5)
+    parser.add_argument("--pages", type=int, help="Stop scraping after this many result pages")
+    parser.add_argument("--generate-workers", type=int, default=2)
+    parser.add_argument("--apply-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run_pipeline(args.stages, args.title, args.location, args.distance, args.applications, args.pages,
+                             args.generate_workers, args.apply_workers, args.queue_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import re
+import threading
+
+# Resource types the flows need: pages, their scripts and styles (visibility checks depend on CSS)
+# and the API calls the job list, job details and Easy Apply forms are built from
+ALLOWED_RESOURCE_TYPES = ("document", "script", "stylesheet", "xhr", "fetch", "eventsource", "websocket")
+BLOCKED_EXTENSIONS = ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp", "woff", "woff2", "ttf", "otf", "eot",
+                      "mp4", "webm", "m3u8", "ts", "mp3", "ogg", "wav")
+# Hosts serving only images, video or analytics, and LinkedIn's own tracking endpoints
+BLOCKED_HOSTS = ("media.licdn.com", "dms.licdn.com", "px.ads.linkedin.com", "ads.linkedin.com", "snap.licdn.com",
+                 "google-analytics.com", "googletagmanager.com", "doubleclick.net", "bat.bing.com",
+                 "connect.facebook.net", "analytics.twitter.com", "static.ads-twitter.com")
+BLOCKED_PATHS = ("/li/track", "/li/tscp", "/sensorCollect", "/platform-telemetry", "/collect")
+REQUEST_BLOCKING_MODES = ("off", "assets", "strict")
+
+
+class RequestPolicy:
+    # Aborts the requests the automation never needs: images, fonts, media and trackers.
+    # "assets" only routes URLs that look like one of those (by extension, host or path), so every
+    # other request goes straight through without a round trip to Python, which matters with the
+    # sync API where route handlers only run while Playwright is being called. "strict" routes
+    # every request and lets through only ALLOWED_RESOURCE_TYPES. One policy can be attached to
+    # several contexts; its counters cover all of them.
+    def __init__(self, mode="off", allowed_types=ALLOWED_RESOURCE_TYPES):
+        if mode not in REQUEST_BLOCKING_MODES:
+            raise ValueError(f"Unknown request blocking mode: {mode}. Available: {', '.join(REQUEST_BLOCKING_MODES)}")
+        self.mode = mode
+        self.allowed_types = set(allowed_types)
+        self.blocked = {}
+        self.loaded = 0
+        self.loaded_bytes = 0
+        self._lock = threading.Lock()
+        hosts = "|".join(re.escape(host) for host in BLOCKED_HOSTS)
+        paths = "|".join(re.escape(path) for path in BLOCKED_PATHS)
+        extensions = "|".join(BLOCKED_EXTENSIONS)
+        self.trackers = rf"^[a-z]+://([^/?#]*\.)?({hosts})(:\d+)?([/?#]|$)|^[a-z]+://[^/?#]+[^?#]*({paths})([/?#]|$)"
+        self.assets = rf"^[^?#]*\.({extensions})([?#]|$)"
+        self._tracker_re = re.compile(self.trackers, re.IGNORECASE)
+
+    def url_pattern(self):
+        if self.mode == "strict":
+            return re.compile(r".*")
+        return re.compile(f"{self.trackers}|{self.assets}", re.IGNORECASE)
+
+    def is_tracker(self, url):
+        return self._tracker_re.search(url) is not None
+
+    def should_block(self, request):
+        resource_type = request.resource_type
+        if resource_type not in self.allowed_types:
+            return True
+        # Scripts and beacons sent to analytics hosts are allowed types but never needed
+        return self.is_tracker(request.url)
+
+    def _count_block(self, resource_type):
+        with self._lock:
+            self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+
+    def handle(self, route):
+        if self.should_block(route.request):
+            self._count_block(route.request.resource_type)
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_async(self, route):
+        if self.should_block(route.request):
+            self._count_block(route.request.resource_type)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def on_response(self, response):
+        # Body size as the server declared it; chunked responses without a length count as 0
+        size = response.headers.get("content-length")
+        with self._lock:
+            self.loaded += 1
+            self.loaded_bytes += int(size) if size and size.isdigit() else 0
+
+    def attach(self, context):
+        # With the mode "off" only the traffic is counted, as a baseline for the other modes
+        context.on("response", self.on_response)
+        if self.mode != "off":
+            context.route(self.url_pattern(), self.handle)
+        return context
+
+    async def attach_async(self, context):
+        context.on("response", self.on_response)
+        if self.mode != "off":
+            await context.route(self.url_pattern(), self.handle_async)
+        return context
+
+    def stats(self, applications=None):
+        with self._lock:
+            stats = {
+                "mode": self.mode,
+                "blocked": sum(self.blocked.values()),
+                "blocked_by_type": dict(self.blocked),
+                "loaded": self.loaded,
+                "loaded_mb": round(self.loaded_bytes / 1e6, 2)
+            }
+            if applications:
+                stats["mb_per_application"] = round(self.loaded_bytes / 1e6 / applications, 2)
+            return stats
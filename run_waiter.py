@@ -0,0 +1,204 @@
+import time
+import logging
+
+TERMINAL_RUN_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+
+class RunTimeoutError(Exception):
+    pass
+
+
+class RunWaiter:
+    # Waits for an Assistants run to reach a terminal status. Runs are streamed
+    # when the SDK supports it, otherwise polled with an adaptive backoff.
+    def __init__(self, client, logger=None, deadline=300, initial_delay=0.25, max_delay=3.0, backoff=1.6, use_streaming=True):
+        self.client = client
+        self.logger = logger or logging.getLogger('Agent')
+        self.deadline = deadline
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.use_streaming = use_streaming
+        self.history = []
+        # Runs this waiter has already finished with, so an older run on the thread is never resumed
+        self.seen_run_ids = set()
+
+    def run(self, thread_id, assistant_id, tool_handler=None, **run_kwargs):
+        started = time.monotonic()
+        deadline = started + self.deadline
+        stats = {"mode": "poll", "polls": 0, "events": 0, "tool_rounds": 0, "run": None}
+        run = None
+        status = "error"
+        usage = None
+        try:
+            if self.use_streaming:
+                try:
+                    run = self._stream(thread_id, assistant_id, tool_handler, deadline, stats, run_kwargs)
+                except RunTimeoutError:
+                    raise
+                except Exception as e:
+                    self.logger.info(f"Streaming run failed, falling back to polling: {str(e)}")
+                    if stats["run"] is not None:
+                        # The last streamed snapshot may be stale, refresh it before polling
+                        run = self.client.beta.threads.runs.retrieve(
+                            thread_id=thread_id,
+                            run_id=stats["run"].id
+                        )
+                        stats["run"] = run
+                    else:
+                        # The stream may have failed after the run was created; a second create
+                        # would then start a duplicate run (or be refused while the first is active)
+                        run = self._find_started_run(thread_id, assistant_id)
+                        stats["run"] = run
+
+            if run is None:
+                run = self.client.beta.threads.runs.create(
+                    thread_id=thread_id,
+                    assistant_id=assistant_id,
+                    **run_kwargs
+                )
+                stats["run"] = run
+            if run.status not in TERMINAL_RUN_STATUSES:
+                run = self._poll(thread_id, run, tool_handler, deadline, stats)
+
+            status = run.status
+            usage = getattr(run, "usage", None)
+            return run
+        except RunTimeoutError:
+            status = "timeout"
+            self._cancel(thread_id, stats["run"])
+            raise
+        finally:
+            wall_time = time.monotonic() - started
+            if stats["run"] is not None:
+                self.seen_run_ids.add(stats["run"].id)
+            self.history.append({
+                "run_id": stats["run"].id if stats["run"] else None,
+                "status": status,
+                "mode": stats["mode"],
+                "polls": stats["polls"],
+                "events": stats["events"],
+                "tool_rounds": stats["tool_rounds"],
+                "wall_time": wall_time,
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+            })
+            self.logger.info(
+                f"Run finished with status '{status}' in {wall_time:.2f}s "
+                f"({stats['mode']}, {stats['polls']} polls, {stats['events']} events, {stats['tool_rounds']} tool rounds)"
+            )
+
+    def _stream(self, thread_id, assistant_id, tool_handler, deadline, stats, run_kwargs):
+        stream = self.client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            stream=True,
+            timeout=self._remaining(deadline),
+            **run_kwargs
+        )
+        stats["mode"] = "stream"
+
+        while stream is not None:
+            next_stream = None
+            try:
+                for event in stream:
+                    stats["events"] += 1
+                    # Only run-level events carry the Run object; step and message events are ignored
+                    if event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step."):
+                        run = event.data
+                        stats["run"] = run
+                        if run.status in TERMINAL_RUN_STATUSES:
+                            return run
+                        if run.status == "requires_action":
+                            if tool_handler is None:
+                                return run
+                            tool_outputs = tool_handler(run.required_action.submit_tool_outputs.tool_calls)
+                            stats["tool_rounds"] += 1
+                            next_stream = self.client.beta.threads.runs.submit_tool_outputs(
+                                thread_id=thread_id,
+                                run_id=run.id,
+                                tool_outputs=tool_outputs,
+                                stream=True,
+                                timeout=self._remaining(deadline)
+                            )
+                            break
+                    if time.monotonic() > deadline:
+                        raise RunTimeoutError(f"Run did not finish within {self.deadline}s")
+            finally:
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+            stream = next_stream
+
+        # The stream ended without a terminal event, let the poller finish the run
+        return stats["run"]
+
+    def _poll(self, thread_id, run, tool_handler, deadline, stats):
+        delay = self.initial_delay
+        while run.status not in TERMINAL_RUN_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RunTimeoutError(f"Run {run.id} did not finish within {self.deadline}s")
+
+            if run.status == "requires_action":
+                if tool_handler is None:
+                    self._cancel(thread_id, run)
+                    return run
+                tool_outputs = tool_handler(run.required_action.submit_tool_outputs.tool_calls)
+                stats["tool_rounds"] += 1
+                run = self.client.beta.threads.runs.submit_tool_outputs(
+                    thread_id=thread_id,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs
+                )
+                # The run is busy again right after tool outputs, start backing off from scratch
+                delay = self.initial_delay
+                continue
+
+            time.sleep(min(delay, remaining))
+            delay = min(delay * self.backoff, self.max_delay)
+            run = self.client.beta.threads.runs.retrieve(
+                thread_id=thread_id,
+                run_id=run.id
+            )
+            stats["polls"] += 1
+            stats["run"] = run
+        return run
+
+    def _find_started_run(self, thread_id, assistant_id):
+        # The thread's newest run, if this waiter has not seen it before and it belongs to the assistant
+        try:
+            runs = self.client.beta.threads.runs.list(thread_id=thread_id, order="desc", limit=1)
+        except Exception as e:
+            self.logger.info(f"Could not list runs of thread {thread_id}: {str(e)}")
+            return None
+        for run in runs.data:
+            if run.id not in self.seen_run_ids and run.assistant_id == assistant_id:
+                self.logger.info(f"Resuming run {run.id} started by the failed stream")
+                return run
+        return None
+
+    def _remaining(self, deadline):
+        return max(1.0, deadline - time.monotonic())
+
+    def _cancel(self, thread_id, run):
+        if run is None:
+            return
+        try:
+            self.client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            self.logger.info(f"Cancelled run {run.id}")
+        except Exception as e:
+            self.logger.info(f"Error cancelling run {run.id}: {str(e)}")
+
+    def report(self):
+        if not self.history:
+            return {"runs": 0, "polls_per_run": 0.0, "avg_wall_time": 0.0, "statuses": {}}
+        statuses = {}
+        for entry in self.history:
+            statuses[entry["status"]] = statuses.get(entry["status"], 0) + 1
+        return {
+            "runs": len(self.history),
+            "polls_per_run": sum(entry["polls"] for entry in self.history) / len(self.history),
+            "avg_wall_time": sum(entry["wall_time"] for entry in self.history) / len(self.history),
+            "statuses": statuses
+        }
@@ -0,0 +1,132 @@
+import json
+import heapq
+import itertools
+from urllib.parse import urlencode
+
+SEARCH_URL = "https://www.linkedin.com/jobs/search/"
+# LinkedIn stops serving results after 40 pages of 25
+MAX_RESULT_PAGES = 40
+
+
+class Search:
+    # One job search: keywords, location, optional distance in miles and any other LinkedIn search
+    # parameters as `filters` (e.g. {"f_TPR": "r604800"} for the past week). Easy Apply only unless
+    # the filters say otherwise.
+    def __init__(self, title, location="United Kingdom", distance=None, filters=None, priority=1.0, max_pages=None):
+        self.title = title
+        self.location = location
+        self.distance = distance
+        self.filters = dict(filters or {})
+        self.priority = float(priority)
+        self.max_pages = min(max_pages or MAX_RESULT_PAGES, MAX_RESULT_PAGES)
+        self.key = self.url()
+        self.pages = 0
+        self.cards = 0
+        self.fresh = 0
+        self.fresh_rate = 1.0
+        self.done = False
+
+    def url(self, start=0):
+        query = {"keywords": self.title, "location": self.location}
+        if self.distance:
+            query["distance"] = str(self.distance)
+        query["f_AL"] = "true"
+        query.update({key: str(value) for key, value in self.filters.items()})
+        if start:
+            query["start"] = str(start)
+        return f"{SEARCH_URL}?{urlencode(query)}"
+
+    def score(self):
+        # Priority, weighted by how many new jobs the search has been turning up and halved for
+        # every page already read, so the first pages of all searches come before deep ones
+        return self.priority * (0.2 + self.fresh_rate) / (1 + self.pages)
+
+    def row(self):
+        return {"search": f"{self.title} / {self.location}", "pages": self.pages, "cards": self.cards,
+                "fresh": self.fresh, "fresh_rate": round(self.fresh_rate, 2), "done": self.done}
+
+
+def load_searches(path):
+    # A JSON list of searches, or {"searches": [...]}; None when the file does not exist
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    entries = data.get("searches", []) if isinstance(data, dict) else data
+    searches = []
+    for entry in entries:
+        if not entry.get("title"):
+            raise ValueError(f"Search without a title in {path}: {entry}")
+        searches.append(Search(entry["title"], entry.get("location", "United Kingdom"), entry.get("distance"),
+                               entry.get("filters"), entry.get("priority", 1.0), entry.get("max_pages")))
+    return searches
+
+
+class SearchScheduler:
+    # Interleaves the result pages of several searches: each turn goes to the search with the best
+    # score, and a search is queued again after every page until it runs out of results or pages.
+    # Job IDs are deduplicated across searches, so a posting that turns up under several queries is
+    # only handed out once per run; jobs handled in earlier runs are already known to the job store,
+    # whose searches table also keeps each search's share of new jobs as its starting estimate.
+    def __init__(self, searches, job_store, page_size=25):
+        self.searches = searches
+        self.job_store = job_store
+        self.page_size = page_size
+        self.taken = set()
+        self.duplicates = 0
+        self.heap = []
+        self._sequence = itertools.count()
+        stored = job_store.stored_searches()
+        for search in searches:
+            if search.key in stored:
+                cards, fresh = stored[search.key]
+                search.fresh_rate = fresh / cards if cards else 1.0
+            self._push(search)
+
+    def _push(self, search):
+        heapq.heappush(self.heap, (-search.score(), next(self._sequence), search))
+
+    def _next_url(self, search):
+        return search.url(search.pages * self.page_size)
+
+    def next_page(self):
+        # (search, url) of the page to read next, or None once every search is done
+        if not self.heap:
+            return None
+        _, _, search = heapq.heappop(self.heap)
+        return search, self._next_url(search)
+
+    def peek_url(self):
+        # The page next_page will return, for prefetching
+        return self._next_url(self.heap[0][2]) if self.heap else None
+
+    def take_page(self, search, cards):
+        # Records a page of cards and returns the ones no earlier page of any search had
+        fresh = []
+        for card in cards:
+            if card["job_id"] in self.taken:
+                self.duplicates += 1
+                continue
+            self.taken.add(card["job_id"])
+            fresh.append(card)
+        new = sum(1 for card in fresh if not self.job_store.is_handled(card["job_id"]))
+        search.pages += 1
+        search.cards += len(cards)
+        search.fresh += new
+        search.fresh_rate = (search.fresh_rate + (new / len(cards) if cards else 0.0)) / 2
+        if cards and search.pages < search.max_pages:
+            self._push(search)
+        else:
+            search.done = True
+        self.job_store.save_search(search.key, search.pages, search.cards, search.fresh)
+        return fresh
+
+    def finish(self, search):
+        # For a page that could not be loaded: the search is not queued again
+        search.done = True
+        self.job_store.save_search(search.key, search.pages, search.cards, search.fresh)
+
+    def stats(self):
+        return {"searches": [search.row() for search in self.searches], "jobs": len(self.taken),
+                "duplicates": self.duplicates}
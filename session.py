@@ -0,0 +1,64 @@
+import json
+import time
+
+SESSION_COOKIE = "li_at"
+# Small JSON endpoint that answers 200 for a signed-in member and 401/403 or a redirect otherwise
+SESSION_PROBE_URL = "https://www.linkedin.com/voyager/api/me"
+
+
+def stored_session(state_path, now=None, margin=60):
+    # Offline check of the storage state Playwright saved: "valid", "expired" or "missing"
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            cookies = json.load(f).get("cookies", [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        return "missing"
+    return cookie_session(cookies, now, margin)
+
+
+def cookie_session(cookies, now=None, margin=60):
+    # From the expiry of LinkedIn's session cookie; session cookies (expires -1) count as valid
+    cookie = next((cookie for cookie in cookies
+                   if cookie.get("name") == SESSION_COOKIE and cookie.get("domain", "").endswith("linkedin.com")), None)
+    if cookie is None:
+        return "missing"
+    expires = cookie.get("expires", -1)
+    if expires != -1 and expires < (now or time.time()) + margin:
+        return "expired"
+    return "valid"
+
+
+def probe_headers(cookies):
+    # The API wants the JSESSIONID value, without its quotes, echoed back as the CSRF token
+    jsession = next((cookie["value"] for cookie in cookies if cookie["name"] == "JSESSIONID"), "")
+    return {"csrf-token": jsession.strip('"'), "accept": "application/json"}
+
+
+def probe_result(status):
+    if status == 200:
+        return True
+    if status in (401, 403) or 300 <= status < 400:
+        return False
+    # Anything else says nothing about the session
+    return None
+
+
+def check_session(context, timeout=10000):
+    # One authenticated request with the context's cookies, no page load: True, False, or None when it could not tell
+    try:
+        response = context.request.get(SESSION_PROBE_URL, headers=probe_headers(context.cookies()),
+                                       max_redirects=0, timeout=timeout)
+        return probe_result(response.status)
+    except Exception as e:
+        print(f"Session check request failed: {str(e)}")
+        return None
+
+
+async def check_session_async(context, timeout=10000):
+    try:
+        response = await context.request.get(SESSION_PROBE_URL, headers=probe_headers(await context.cookies()),
+                                             max_redirects=0, timeout=timeout)
+        return probe_result(response.status)
+    except Exception as e:
+        print(f"Session check request failed: {str(e)}")
+        return None
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from answer_store import AnswerBook, QuestionIndex, normalize_question
+from form_plan import plan_unknown_fields
+
+
+class FakeJobStore:
+    def __init__(self):
+        self.answers = {}
+
+    def stored_answers(self):
+        return [(question, kind, answer, label, 1) for (question, kind), (answer, label) in self.answers.items()]
+
+    def save_answer(self, question, kind, answer, label):
+        self.answers[(question, kind)] = (answer, label)
+
+
+def match_score(stored, asked):
+    index = QuestionIndex()
+    index.add(normalize_question(stored), "Yes")
+    return index.match(normalize_question(asked))[2]
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("Are you currently living in the UK?", "Are you currently living in the US?"),
+    ("How many years of experience do you have with Python?", "How many years of experience do you have with Java?"),
+    ("Do you hold a full UK driving licence?", "Do you hold a full EU driving licence?"),
+    ("Are you eligible to work in the UK?", "Are you ineligible to work in the UK?"),
+])
+def test_one_deciding_word_keeps_questions_apart(stored, asked):
+    assert match_score(stored, asked) < 0.85
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("Are you legally authorised to work in the UK? *", "are you legally authorised to work in the uk"),
+    ("Are you legally authorised to work in the UK?", "Are you legally authorized to work in the UK?"),
+    ("Do you have a full UK driving license?", "Do you have a full UK driving licence?"),
+])
+def test_rewording_and_spelling_still_match(stored, asked):
+    assert match_score(stored, asked) >= 0.85
+
+
+def test_answer_book_does_not_replay_an_answer_to_a_different_question():
+    book = AnswerBook(FakeJobStore())
+    book.remember("application", "Are you currently living in the UK?", "radio", "Yes")
+    book.confirm("application")
+    assert book.lookup("Are you currently living in the UK?", "radio", ["Yes", "No"]) == "Yes"
+    assert book.lookup("Are you currently living in the US?", "radio", ["Yes", "No"]) is None
+
+
+def field(field_id, label, type="text", tag="input", name="", group="", options=None, checked=False, value=""):
+    return {"id": field_id, "name": name, "tag": tag, "type": type, "label": label, "group": group, "value": value,
+            "checked": checked, "required": True, "options": options or []}
+
+
+def test_guesses_and_placeholders_are_not_learned():
+    snapshot = {"fields": [
+        field("text-1", "Describe your notice period"),
+        field("numeric-2", "Expected day rate"),
+        field("select-3", "Preferred shift", type="select-one", tag="select",
+              options=[{"value": "", "text": "Select an option"}, {"value": "a", "text": "Early"}, {"value": "b", "text": "Late"}]),
+        field("radio-4", "Yes", type="radio", name="relocate", group="Are you willing to relocate?"),
+        field("radio-5", "No", type="radio", name="relocate", group="Are you willing to relocate?"),
+        field("radio-6", "Yes", type="radio", name="clearance", group="Do you hold security clearance?"),
+        field("radio-7", "No", type="radio", name="clearance", group="Do you hold security clearance?"),
+    ]}
+    actions = {action["id"]: action for action in plan_unknown_fields(snapshot, {}, rng=random.Random(1))}
+    assert not actions["text-1"]["learn"]
+    assert not actions["numeric-2"]["learn"]
+    assert not actions["select-3"]["learn"]
+    # Answered by the rules, so worth remembering
+    assert actions["radio-4"]["learn"]
+    clearance = actions.get("radio-6") or actions["radio-7"]
+    assert not clearance["learn"]
+
+
+def test_remembered_answers_are_used_and_learned():
+    book = AnswerBook(FakeJobStore())
+    book.remember("application", "Describe your notice period", "text", "Two weeks")
+    book.confirm("application")
+    snapshot = {"fields": [field("text-1", "Describe your notice period")]}
+    [action] = plan_unknown_fields(snapshot, {}, rng=random.Random(1), answers=book)
+    assert action["value"] == "Two weeks"
+    assert action["learn"]
@@ -0,0 +1,136 @@
+import os
+import re
+import threading
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from benchmark import write_fixture_site
+from request_policy import RequestPolicy
+
+IMAGES = 5
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.do_GET()
+
+
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    site_dir = str(tmp_path_factory.mktemp("site"))
+    write_fixture_site(site_dir, images=IMAGES, image_kb=4)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=site_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield SimpleNamespace(dir=site_dir, url=f"http://127.0.0.1:{server.server_address[1]}/")
+    server.shutdown()
+    server.server_close()
+
+
+def fixture_requests(site):
+    # (url, resource type) for everything a browser loading index.html asks for, in the order it would
+    with open(os.path.join(site.dir, "index.html")) as f:
+        html = f.read()
+    with open(os.path.join(site.dir, "style.css")) as f:
+        css = f.read()
+    requests = [(site.url + "index.html", "document")]
+    requests += [(site.url + href, "stylesheet") for href in re.findall(r'<link[^>]*href="([^"]+)"', html)]
+    requests += [(site.url + src, "font") for src in re.findall(r"url\(([^)]+)\)", css)]
+    requests += [(site.url + src, "image") for src in re.findall(r'<img src="([^"]+)"', html)]
+    requests += [(site.url + src, "media") for src in re.findall(r'<video src="([^"]+)"', html)]
+    requests += [(site.url + src, "script") for src in re.findall(r'<script src="([^"]+)"', html)]
+    requests += [(site.url + "li/track?event=view", "fetch")]
+    return requests
+
+
+class FixtureRoute:
+    # Stands in for Playwright's Route: continue_ fetches from the fixture server and reports the response
+    def __init__(self, url, resource_type, policy):
+        self.request = SimpleNamespace(url=url, resource_type=resource_type)
+        self.policy = policy
+
+    def continue_(self):
+        with urllib.request.urlopen(self.request.url) as response:
+            response.read()
+            self.policy.on_response(SimpleNamespace(headers={key.lower(): value for key, value in response.headers.items()}))
+
+    def abort(self):
+        pass
+
+
+def load_fixture(policy, site):
+    # What a context with the policy attached does: only URLs matching its pattern reach the handler
+    pattern = policy.url_pattern() if policy.mode != "off" else None
+    for url, resource_type in fixture_requests(site):
+        route = FixtureRoute(url, resource_type, policy)
+        if pattern and pattern.search(url):
+            policy.handle(route)
+        else:
+            route.continue_()
+
+
+def allowed_bytes(site):
+    return sum(os.path.getsize(os.path.join(site.dir, name)) for name in ("index.html", "style.css", "app.js"))
+
+
+def test_off_loads_and_counts_everything(site):
+    policy = RequestPolicy("off")
+    load_fixture(policy, site)
+    stats = policy.stats()
+    # Page, stylesheet, font, images, video, script and the tracking call
+    assert stats["loaded"] == IMAGES + 6
+    assert stats["blocked"] == 0
+    assert stats["blocked_by_type"] == {}
+
+
+@pytest.mark.parametrize("mode", ["assets", "strict"])
+def test_blocking_modes_only_load_what_the_flows_need(site, mode):
+    policy = RequestPolicy(mode)
+    load_fixture(policy, site)
+    stats = policy.stats(applications=2)
+    assert stats["mode"] == mode
+    assert stats["loaded"] == 3
+    assert stats["loaded_mb"] == round(allowed_bytes(site) / 1e6, 2)
+    assert stats["blocked_by_type"] == {"font": 1, "image": IMAGES, "media": 1, "fetch": 1}
+    assert stats["blocked"] == IMAGES + 3
+    assert stats["mb_per_application"] == round(allowed_bytes(site) / 1e6 / 2, 2)
+
+
+def test_assets_mode_never_routes_documents_scripts_or_styles(site):
+    pattern = RequestPolicy("assets").url_pattern()
+    routed = {resource_type for url, resource_type in fixture_requests(site) if pattern.search(url)}
+    assert routed == {"font", "image", "media", "fetch"}
+
+
+@pytest.mark.parametrize("mode", ["off", "assets", "strict"])
+def test_browser_load_matches_the_policy_counts(site, mode):
+    # The same fixture in a real Chromium, when Playwright and its browser are installed
+    sync_api = pytest.importorskip("playwright.sync_api")
+    with sync_api.sync_playwright() as playwright:
+        try:
+            browser = playwright.chromium.launch(headless=True)
+        except Exception as e:
+            pytest.skip(f"Chromium is not available: {e}")
+        policy = RequestPolicy(mode)
+        context = policy.attach(browser.new_context())
+        page = context.new_page()
+        page.goto(site.url + "index.html", wait_until="load")
+        page.wait_for_selector('body[data-ready="true"]')
+        page.wait_for_timeout(500)
+        context.close()
+        browser.close()
+    stats = policy.stats()
+    if mode == "off":
+        # The browser may add requests of its own (a favicon, ranges of the video), so only a floor
+        assert stats["blocked"] == 0
+        assert stats["loaded"] >= IMAGES + 5
+    else:
+        assert stats["loaded"] == 3
+        for resource_type, count in {"font": 1, "image": IMAGES, "media": 1, "fetch": 1}.items():
+            assert stats["blocked_by_type"].get(resource_type) == count
@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from run_waiter import RunTimeoutError, RunWaiter
+
+
+class FakeAssistants:
+    # Just enough of the Assistants runs API for RunWaiter, served over HTTP on localhost
+    # break_stream: None, "after_create" (the run exists but its stream dies) or "before_create"
+    def __init__(self, polls_until_done=2, break_stream=None):
+        self.polls_until_done = polls_until_done
+        self.break_stream = break_stream
+        self.runs = {}
+        self.created = []
+        self.cancelled = []
+        self.lock = threading.Lock()
+
+    def create(self, thread_id, assistant_id):
+        with self.lock:
+            run = {"id": f"run_{len(self.created) + 1}", "object": "thread.run", "thread_id": thread_id,
+                   "assistant_id": assistant_id, "status": "in_progress", "created_at": int(time.time()), "polls": 0}
+            self.runs[run["id"]] = run
+            self.created.append(run["id"])
+            return run
+
+    def retrieve(self, run_id):
+        with self.lock:
+            run = self.runs[run_id]
+            run["polls"] += 1
+            if run["status"] == "in_progress" and self.polls_until_done is not None and run["polls"] >= self.polls_until_done:
+                run["status"] = "completed"
+            return run
+
+
+def handler_for(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, body, status=200):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            # v1/threads/<thread>/runs[/<run>]
+            if len(parts) == 4:
+                runs = [run for run in fake.runs.values() if run["thread_id"] == parts[2]]
+                runs.sort(key=lambda run: run["id"], reverse=True)
+                self.send_json({"object": "list", "data": runs[:1], "has_more": False})
+            else:
+                self.send_json(fake.retrieve(parts[4]))
+
+        def do_POST(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if len(parts) == 6 and parts[5] == "cancel":
+                fake.cancelled.append(parts[4])
+                fake.runs[parts[4]]["status"] = "cancelled"
+                self.send_json(fake.runs[parts[4]])
+                return
+            if body.get("stream") and fake.break_stream == "before_create":
+                self.send_json({"error": {"message": "stream refused", "type": "server_error"}}, status=500)
+                return
+            run = fake.create(parts[2], body["assistant_id"])
+            if not body.get("stream"):
+                self.send_json(run)
+                return
+            if fake.break_stream == "after_create":
+                self.send_json({"error": {"message": "stream broke", "type": "server_error"}}, status=500)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for status in ("queued", "in_progress", "completed"):
+                run["status"] = status
+                self.wfile.write(f"event: thread.run.{status}\ndata: {json.dumps(run)}\n\n".encode())
+            self.wfile.write(b"event: done\ndata: [DONE]\n\n")
+            self.close_connection = True
+
+    return Handler
+
+
+def namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [namespace(item) for item in value]
+    return value
+
+
+class HttpRuns:
+    # The runs calls RunWaiter makes, over plain urllib, so the tests do not need the openai SDK
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(f"{self.base_url}{path}", data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        return urllib.request.urlopen(request, timeout=10)
+
+    def call(self, method, path, body=None):
+        with self.request(method, path, body) as response:
+            return namespace(json.load(response))
+
+    def create(self, thread_id, assistant_id, stream=False, timeout=None, **kwargs):
+        body = dict(kwargs, assistant_id=assistant_id, stream=stream)
+        if not stream:
+            return self.call("POST", f"/threads/{thread_id}/runs", body)
+        return self.events(self.request("POST", f"/threads/{thread_id}/runs", body))
+
+    def events(self, response):
+        with response:
+            event = None
+            for line in response:
+                line = line.decode().strip()
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    if line == "data: [DONE]":
+                        return
+                    yield SimpleNamespace(event=event, data=namespace(json.loads(line[len("data: "):])))
+
+    def retrieve(self, thread_id, run_id):
+        return self.call("GET", f"/threads/{thread_id}/runs/{run_id}")
+
+    def list(self, thread_id, order="desc", limit=20):
+        return self.call("GET", f"/threads/{thread_id}/runs?order={order}&limit={limit}")
+
+    def cancel(self, thread_id, run_id):
+        return self.call("POST", f"/threads/{thread_id}/runs/{run_id}/cancel", {})
+
+
+@pytest.fixture(params=["http", "openai"])
+def serve(request):
+    # Every test runs against the fake server with the urllib client, and again through the
+    # openai SDK when it is installed
+    if request.param == "openai":
+        openai = pytest.importorskip("openai")
+    servers = []
+
+    def start(fake):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler_for(fake))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        base_url = f"http://127.0.0.1:{server.server_port}/v1"
+        if request.param == "openai":
+            return openai.OpenAI(api_key="test", base_url=base_url, max_retries=0)
+        return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(runs=HttpRuns(base_url))))
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_streamed_run_stops_at_terminal_status(serve):
+    fake = FakeAssistants()
+    waiter = RunWaiter(serve(fake), deadline=10)
+    run = waiter.run("thread_1", "asst_1")
+    assert run.status == "completed"
+    assert fake.created == ["run_1"]
+    assert waiter.history[-1]["mode"] == "stream"
+    assert waiter.history[-1]["polls"] == 0
+
+
+def test_polled_run_stops_at_terminal_status(serve):
+    fake = FakeAssistants(polls_until_done=3)
+    waiter = RunWaiter(serve(fake), deadline=10, initial_delay=0.01, use_streaming=False)
+    run = waiter.run("thread_1", "asst_1")
+    assert run.status == "completed"
+    assert waiter.history[-1]["polls"] == 3
+
+
+def test_run_past_deadline_is_cancelled(serve):
+    fake = FakeAssistants(polls_until_done=None)
+    waiter = RunWaiter(serve(fake), deadline=0.3, initial_delay=0.05, max_delay=0.05, use_streaming=False)
+    with pytest.raises(RunTimeoutError):
+        waiter.run("thread_1", "asst_1")
+    assert fake.cancelled == ["run_1"]
+    assert waiter.history[-1]["status"] == "timeout"
+
+
+def test_failed_stream_resumes_its_run_instead_of_creating_another(serve):
+    fake = FakeAssistants(break_stream="after_create")
+    waiter = RunWaiter(serve(fake), deadline=10, initial_delay=0.01)
+    run = waiter.run("thread_1", "asst_1")
+    assert run.status == "completed"
+    assert fake.created == ["run_1"]
+
+
+def test_failed_stream_does_not_resume_an_earlier_run(serve):
+    fake = FakeAssistants()
+    waiter = RunWaiter(serve(fake), deadline=10, initial_delay=0.01)
+    waiter.run("thread_1", "asst_1")
+    # The next stream fails before creating its run, so the thread's newest run is the finished one
+    fake.break_stream = "before_create"
+    run = waiter.run("thread_1", "asst_1")
+    assert run.id == "run_2"
+    assert run.status == "completed"
+    assert fake.created == ["run_1", "run_2"]